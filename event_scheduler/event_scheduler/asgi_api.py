@@ -0,0 +1,17 @@
+"""
+ASGI config for the API-only profile of event_scheduler.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+configured with `settings_api` (no admin, sessions, templates or CSRF).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_scheduler.settings_api')
+
+application = get_asgi_application()
@@ -53,7 +53,10 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'events.middleware.ProfilingMiddleware',
+    'events.middleware.ReplicaStickinessMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
+    'events.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +66,27 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Responses below this size (bytes) are not compressed; Brotli is used when the
+# optional `brotli` package is installed and the client accepts it
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Requests slower than PROFILE_SLOW_REQUEST_MS (plus a random PROFILE_SAMPLE_RATE
+# fraction) are stack-sampled into PROFILE_DIR; summarize with `profile_summary`.
+# Profiling is off while both are unset.
+PROFILE_SLOW_REQUEST_MS = None
+PROFILE_SAMPLE_RATE = 0
+PROFILE_INTERVAL_MS = 5
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_MAX_FILES = 200
+
+# Logins and writes warm the user's current and next month in the cache (see
+# events.warmup); 0 workers disables warming. Only enable it with a CACHES
+# backend shared by all worker processes (e.g. Redis)
+EVENT_WARMUP_WORKERS = 0
+EVENT_WARMUP_MAX_PENDING = 100
+EVENT_WARMUP_TIMEOUT = 600
+
 ROOT_URLCONF = 'event_scheduler.urls'
 
 TEMPLATES = [
@@ -98,6 +122,20 @@ DATABASES = {
     }
 }
 
+# Databases holding user event data; see events.sharding and settings_sharded
+EVENT_SHARDS = ['default']
+
+DATABASE_ROUTERS = ['events.routers.UserShardRouter']
+
+# Read replicas per primary alias, e.g. {'default': ['replica_1']}; see
+# events.replicas and settings_replicas
+DATABASE_REPLICAS = {}
+# Replicas further behind than this are skipped; health is rechecked at this interval
+REPLICA_MAX_LAG_SECONDS = 5
+REPLICA_CHECK_INTERVAL = 5
+# A user's reads stay on the primaries this long after they write (keep above the max lag)
+REPLICA_STICKY_SECONDS = 10
+
 
 
 CORS_ORIGIN_ALLOW_ALL = True
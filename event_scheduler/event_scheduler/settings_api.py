@@ -0,0 +1,44 @@
+"""
+API-only settings for event_scheduler.
+
+The API is JWT-only and renders JSON, so the admin, sessions, messages,
+staticfiles and template machinery from the default settings are dropped. This
+keeps the import graph and the per-request middleware chain short, which makes
+autoscaled workers start and answer faster. Served by `wsgi_api` / `asgi_api`.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'events',
+    'rest_framework',
+    'rest_framework_simplejwt',
+    'corsheaders',
+]
+
+MIDDLEWARE = [
+    'events.middleware.ProfilingMiddleware',
+    'events.middleware.ReplicaStickinessMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'events.middleware.CompressionMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'event_scheduler.urls_api'
+
+TEMPLATES = []
+
+WSGI_APPLICATION = 'event_scheduler.wsgi_api.application'
+
+# The browsable API needs templates and sessions; serve plain JSON only
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+    ],
+}
@@ -0,0 +1,35 @@
+"""
+In-memory SQLite settings for event_scheduler.
+
+Runs the whole app without the PostgreSQL service, for tests, CI and local
+benchmarks: `DJANGO_SETTINGS_MODULE=event_scheduler.settings_memory`. The
+database is migrated automatically on first use in every process and is gone
+when the process exits. Passwords use a fast hasher, so this profile must never
+serve real users.
+
+SQLite's shared-cache mode locks whole tables, so concurrent writers (e.g.
+`loadtest --concurrency` above 1) can fail with "database table is locked";
+measure concurrency against PostgreSQL.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+
+def memory_database(name):
+    # A named shared-cache database is visible to every connection (thread) of the process
+    return {
+        # SQLite, creating PostgreSQL array columns as text (see events.backends.sqlite3)
+        'ENGINE': 'events.backends.sqlite3',
+        'NAME': f'file:{name}?mode=memory&cache=shared',
+        'TEST': {'NAME': f'file:test_{name}?mode=memory&cache=shared'},
+    }
+
+
+DATABASES = {
+    'default': memory_database('event_scheduler'),
+}
+
+# Migrate in-memory databases when a process first connects (see events.apps)
+MIGRATE_MEMORY_DATABASES = True
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
@@ -0,0 +1,22 @@
+"""
+In-memory SQLite settings with two event shards and a replica for each.
+
+Like `settings_memory_sharded`, plus stand-in replicas that share their
+primary's in-memory database (zero lag), to exercise the replica routing of
+`events.replicas` without PostgreSQL.
+"""
+
+from .settings_memory_sharded import *  # noqa: F401,F403
+from .settings_memory_sharded import DATABASES
+
+
+DATABASES = {
+    **DATABASES,
+    'replica_default': {**DATABASES['default'], 'TEST': {**DATABASES['default']['TEST'], 'MIRROR': 'default'}},
+    'replica_shard_1': {**DATABASES['shard_1'], 'TEST': {**DATABASES['shard_1']['TEST'], 'MIRROR': 'shard_1'}},
+}
+
+DATABASE_REPLICAS = {
+    'default': ['replica_default'],
+    'shard_1': ['replica_shard_1'],
+}
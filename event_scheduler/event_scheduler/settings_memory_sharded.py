@@ -0,0 +1,18 @@
+"""
+In-memory SQLite settings with two event shards.
+
+Like `settings_memory`, but user event data is spread over `default` and
+`shard_1` (see `events.sharding`), to exercise the sharded code paths without
+PostgreSQL.
+"""
+
+from .settings_memory import *  # noqa: F401,F403
+from .settings_memory import DATABASES, memory_database
+
+
+DATABASES = {
+    **DATABASES,
+    'shard_1': memory_database('event_scheduler_shard_1'),
+}
+
+EVENT_SHARDS = ['default', 'shard_1']
@@ -0,0 +1,21 @@
+"""
+Read-replica settings for event_scheduler.
+
+Safe reads of the calendar endpoints go to `replica_1` (see `events.replicas`).
+Out of the box the replica is a stand-in pointing at the primary database, so
+the routing can be tried locally; point `replica_1` at a real streaming replica
+in production. To combine with sharding, add replicas for the shard aliases to
+`DATABASE_REPLICAS` as well, e.g. `{'shard_1': ['shard_1_replica']}`.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+
+DATABASES = {
+    **DATABASES,
+    # Tests read the primary's test database through the replica alias
+    'replica_1': {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}},
+}
+
+DATABASE_REPLICAS = {'default': ['replica_1']}
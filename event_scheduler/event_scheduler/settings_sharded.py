@@ -0,0 +1,21 @@
+"""
+Sharded settings for event_scheduler.
+
+User event data is spread over several PostgreSQL databases (see
+`events.sharding`); users, auth tables and the shard map stay on `default`.
+Create the shard databases, migrate each of them
+(`manage.py migrate --database shard_1`, ...) and reserve disjoint id ranges
+with `manage.py rebalance_shards --reserve-id-ranges` before serving traffic.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+
+DATABASES = {
+    **DATABASES,
+    'shard_1': {**DATABASES['default'], 'NAME': 'event_scheduler_shard_1'},
+    'shard_2': {**DATABASES['default'], 'NAME': 'event_scheduler_shard_2'},
+}
+
+EVENT_SHARDS = ['default', 'shard_1', 'shard_2']
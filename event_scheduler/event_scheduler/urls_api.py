@@ -0,0 +1,16 @@
+"""
+URL configuration for the API-only profile (`settings_api`).
+
+Contains only the JSON API and the JWT token endpoints; `urls` adds the admin
+on top of these for the full profile.
+"""
+from django.urls import path, include
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from events.views import WarmingTokenObtainPairView
+
+urlpatterns = [
+    path('api/token/', WarmingTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/', include('events.urls')),
+]
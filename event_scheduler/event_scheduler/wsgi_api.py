@@ -0,0 +1,17 @@
+"""
+WSGI config for the API-only profile of event_scheduler.
+
+It exposes the WSGI callable as a module-level variable named ``application``,
+configured with `settings_api` (no admin, sessions, templates or CSRF).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_scheduler.settings_api')
+
+application = get_wsgi_application()
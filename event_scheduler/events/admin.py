@@ -1,6 +1,172 @@
-from django.contrib import admin
-from .models import Event
-from .models import RecurrenceRule
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
-admin.site.register(Event)
-admin.site.register(RecurrenceRule)
+from . import warmup
+from .models import ArchivedEvent, Event, RecurrenceRule
+from .sharding import shard_for_user
+
+# Unfiltered tables larger than this show the planner's row estimate
+ESTIMATE_THRESHOLD = 10000
+# Filtered changelists stop counting here; later pages are reached by narrowing the filters
+COUNT_LIMIT = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids a full `COUNT(*)` on large tables.
+
+    An unfiltered changelist on PostgreSQL uses the row estimate kept by the
+    planner (`pg_class.reltuples`). Filtered querysets are counted up to
+    COUNT_LIMIT rows only.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self.estimated_rows(queryset)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return queryset.order_by()[:COUNT_LIMIT].count()
+
+    def estimated_rows(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
+class UserIdFilter(admin.SimpleListFilter):
+    """
+    Filter by owner id, typed in rather than picked from a list of every user.
+
+    Reads from the shard holding that user's rows.
+    """
+    title = 'user id'
+    parameter_name = 'user_id'
+    template = 'admin/events/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'parameter_name': self.parameter_name,
+            'value': self.value() or '',
+            # Keep the other filters, the search and the ordering when submitting
+            'hidden_params': [
+                (name, value) for name, values in changelist.filter_params.items()
+                if name != self.parameter_name for value in values
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            user_id = int(self.value())
+        except ValueError:
+            raise IncorrectLookupParameters(f"Invalid user id: {self.value()!r}")
+        return queryset.using(shard_for_user(user_id)).filter(user_id=user_id)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings shared by the event tables.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    list_select_related = ('recurrence_rule',)
+    list_filter = (UserIdFilter, 'start_time', 'is_recurring')
+    date_hierarchy = 'start_time'
+    raw_id_fields = ('user', 'recurrence_rule')
+
+    @admin.display(description='user', ordering='user_id')
+    def owner(self, obj):
+        # The id only: users live on the default database, events on their shard
+        return obj.user_id
+
+    def get_actions(self, request):
+        # The default action loads every selected row to list related objects
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+
+@admin.register(Event)
+class EventAdmin(LargeTableAdmin):
+    list_display = ('title', 'owner', 'start_time', 'end_time', 'is_recurring', 'recurrence_rule')
+    actions = ['delete_with_rules']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        warmup.events_changed(obj.user_id)
+
+    def delete_model(self, request, obj):
+        Event.objects.using(obj._state.db).filter(pk=obj.pk).delete_with_rules()
+        warmup.events_changed(obj.user_id)
+
+    @admin.action(description="Delete selected events and their unused recurrence rules", permissions=['delete'])
+    def delete_with_rules(self, request, queryset):
+        user_ids = list(queryset.order_by().values_list('user_id', flat=True).distinct())
+        deleted = queryset.delete_with_rules()
+        for user_id in user_ids:
+            warmup.events_changed(user_id)
+        self.message_user(request, f"Deleted {deleted} event(s).", messages.SUCCESS)
+
+
+@admin.register(ArchivedEvent)
+class ArchivedEventAdmin(LargeTableAdmin):
+    """
+    Read-only: rows only arrive through `archive_events` and are never deleted here.
+    """
+    list_display = ('title', 'owner', 'start_time', 'end_time', 'is_recurring', 'archived_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RecurrenceRule)
+class RecurrenceRuleAdmin(admin.ModelAdmin):
+    """
+    Read-only: rules are interned and shared, so they are never edited in place.
+    """
+    list_display = ('__str__', 'frequency', 'interval', 'end_date')
+    list_filter = ('frequency',)
+    search_fields = ('signature__exact',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    actions = ['delete_unused']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description="Delete selected rules no event uses", permissions=['delete'])
+    def delete_unused(self, request, queryset):
+        deleted = queryset.delete_orphaned()
+        self.message_user(request, f"Deleted {deleted} unused rule(s).", messages.SUCCESS)
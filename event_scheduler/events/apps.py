@@ -1,6 +1,37 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.management import call_command
+from django.db.backends.signals import connection_created
+
+_migrated_databases = set()
+
+
+def migrate_memory_database(sender, connection, **kwargs):
+    """Migrate an in-memory database the first time the process connects to it."""
+    from .replicas import is_replica, primary_for
+
+    name = connection.settings_dict['NAME']
+    if connection.vendor != 'sqlite' or not connection.is_in_memory_db():
+        return
+    if is_replica(connection.alias):
+        # A replica stand-in shares its primary's database; without this it would
+        # block on the table locks of the primary's open (e.g. test) transaction
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA read_uncommitted = 1')
+    if name in _migrated_databases:
+        return
+    _migrated_databases.add(name)
+    # Migrations only run on primaries
+    call_command('migrate', database=primary_for(connection.alias), interactive=False, verbosity=0)
 
 
 class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'events'
+
+    def ready(self):
+        # Connects the signal removing a deleted user's data from their shard
+        from . import sharding  # noqa: F401
+
+        if getattr(settings, 'MIGRATE_MEMORY_DATABASES', False):
+            connection_created.connect(migrate_memory_database)
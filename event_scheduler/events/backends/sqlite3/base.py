@@ -0,0 +1,24 @@
+"""
+SQLite backend for the in-memory profiles.
+
+Migration 0005 adds `weekdays` as a PostgreSQL `ArrayField` (the field later
+became `PortableArrayField` in 0013). SQLite cannot parse array column types
+such as `varchar(3)[]`, so array columns are created as `text` here, which is
+how `PortableArrayField` stores them outside PostgreSQL.
+"""
+from django.contrib.postgres.fields import ArrayField
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseSchemaEditor(base.DatabaseWrapper.SchemaEditorClass):
+
+    def column_sql(self, model, field, include_default=False):
+        sql, params = super().column_sql(model, field, include_default)
+        db_type = field.db_type(self.connection)
+        if sql is not None and isinstance(field, ArrayField) and sql.startswith(db_type):
+            sql = 'text' + sql[len(db_type):]
+        return sql, params
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    SchemaEditorClass = DatabaseSchemaEditor
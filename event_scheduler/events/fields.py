@@ -0,0 +1,46 @@
+import json
+
+from django.contrib.postgres.fields import ArrayField
+
+
+class PortableArrayField(ArrayField):
+    """
+    ArrayField that also works outside PostgreSQL.
+
+    On PostgreSQL this is a native array column, identical to `ArrayField`. On
+    other databases (e.g. the in-memory SQLite profile) the list is stored as a
+    JSON-encoded text column. Array-specific lookups (`contains`, `overlap`,
+    index transforms) remain PostgreSQL-only.
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return super().db_type(connection)
+        return 'text'
+
+    def cast_db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return super().cast_db_type(connection)
+        return 'text'
+
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor == 'postgresql':
+            return super().get_placeholder(value, compiler, connection)
+        return '%s'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if connection.vendor == 'postgresql' or value is None:
+            return value
+        return json.dumps(value)
+
+    def get_db_converters(self, connection):
+        converters = super().get_db_converters(connection)
+        if connection.vendor != 'postgresql':
+            converters = [self._from_json, *converters]
+        return converters
+
+    def _from_json(self, value, expression, connection):
+        if value is None:
+            return value
+        return json.loads(value)
@@ -0,0 +1,142 @@
+import gzip
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from events.models import Event, RecurrenceRule
+from events.recurrence import expand_window
+from events.serializers import EventSerializer
+from events.sharding import shard_for_user
+from events.snapshot import MEDIA_TYPE, decode, encode_window
+
+BENCH_USERNAME = 'bench-listing'
+GRID_FIELDS = 'id,title,start_time,end_time'
+
+
+class Command(BaseCommand):
+    """
+    Compare payload size and latency of event listings.
+
+    Seeds a synthetic user, then requests the same calendar window with the full
+    and the sparse (`?fields=`) representation and as a binary snapshot, each
+    uncompressed, gzip and Brotli encoded, through the whole middleware and DRF
+    stack. JSON pages hold at most 100 occurrences, while a snapshot holds the
+    whole window. The `encode` section therefore compares the JSON and snapshot
+    encodings of the whole window in-process: size and encode/decode time,
+    without the database. Results are printed as JSON.
+    """
+    help = "Benchmark list payload size and latency for sparse fieldsets, snapshots and compression."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=200, help="Events to seed (default: 200).")
+        parser.add_argument('--recurring-ratio', type=float, default=0.3, help="Share of recurring events (default: 0.3).")
+        parser.add_argument('--days', type=int, default=90, help="Length of the listed window in days (default: 90).")
+        parser.add_argument('--runs', type=int, default=5, help="Requests per variant (default: 5).")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded user and events afterwards.")
+
+    def handle(self, *args, **options):
+        if options['events'] <= 0 or options['runs'] <= 0 or options['days'] <= 0:
+            raise CommandError("--events, --runs and --days must be positive integers.")
+
+        user = self.seed(options['events'], options['recurring_ratio'], options['days'])
+        client = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        start = timezone.now().date()
+        window = f"start_date={start}&end_date={start + timedelta(days=options['days'])}&page_size=100"
+
+        report = {}
+        try:
+            variants = (
+                ('full', window, 'application/json'),
+                ('sparse', f'{window}&fields={GRID_FIELDS}', 'application/json'),
+                ('snapshot', window, MEDIA_TYPE),
+            )
+            for name, query, accept in variants:
+                for encoding in ('identity', 'gzip', 'br'):
+                    report[f'{name}/{encoding}'] = self.measure(
+                        client, f'/api/events/?{query}', encoding, options['runs'], accept
+                    )
+            report['encode'] = self.measure_encoding(
+                user, start, start + timedelta(days=options['days']), options['runs']
+            )
+        finally:
+            if not options['keep']:
+                Event.objects.for_user(user).delete_with_rules()
+                user.delete()
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def seed(self, count, recurring_ratio, days):
+        User.objects.filter(username=BENCH_USERNAME).delete()
+        user = User.objects.create_user(username=BENCH_USERNAME, email=f'{BENCH_USERNAME}@example.com')
+        rules = RecurrenceRule.objects.using(shard_for_user(user))
+        base = timezone.now() + timedelta(hours=1)
+        for i in range(count):
+            start = base + timedelta(days=random.randint(0, days), hours=random.randint(0, 12))
+            rule = None
+            if random.random() < recurring_ratio:
+                rule = rules.intern(frequency=random.choice(['DAILY', 'MONTHLY']))
+            Event.objects.create(
+                user=user,
+                title=f'Benchmark event {i}',
+                description='Quarterly planning with the extended team. ' * 4,
+                location='Conference room B',
+                start_time=start,
+                end_time=start + timedelta(hours=1),
+                is_recurring=rule is not None,
+                recurrence_rule=rule
+            )
+        return user
+
+    def measure(self, client, url, encoding, runs, accept='application/json'):
+        latencies = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            response = client.get(url, HTTP_ACCEPT_ENCODING=encoding, HTTP_ACCEPT=accept)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}.")
+        return {
+            'content_encoding': response.headers.get('Content-Encoding', 'identity'),
+            'bytes': len(response.content),
+            'latency_ms_median': round(statistics.median(latencies), 3),
+        }
+
+    def measure_encoding(self, user, start_date, end_date, runs):
+        """Encode and decode the whole window as JSON and as a snapshot, from loaded events."""
+        events = list(
+            Event.objects.for_user(user).in_window(start_date, end_date)
+            .select_related('recurrence_rule').order_by('start_time')
+        )
+
+        def encode_json():
+            return JSONRenderer().render(EventSerializer(expand_window(events, start_date, end_date), many=True).data)
+
+        def encode_snapshot():
+            return encode_window(events, start_date, end_date)
+
+        report = {}
+        for name, encode, decode_payload in (('json', encode_json, json.loads), ('snapshot', encode_snapshot, decode)):
+            encode_ms, decode_ms = [], []
+            for _ in range(runs):
+                started = time.perf_counter()
+                payload = encode()
+                encode_ms.append((time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                decode_payload(payload)
+                decode_ms.append((time.perf_counter() - started) * 1000)
+            report[name] = {
+                'bytes': len(payload),
+                'gzip_bytes': len(gzip.compress(payload)),
+                'encode_ms_median': round(statistics.median(encode_ms), 3),
+                'decode_ms_median': round(statistics.median(decode_ms), 3),
+            }
+        report['occurrences'] = len(decode(encode_snapshot()).starts)
+        return report
@@ -0,0 +1,103 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: imports the WSGI entry point (which sets Django up)
+# and serves one request that needs no database.
+PROBE = r"""
+import io, json, sys, time
+started = time.perf_counter()
+from importlib import import_module
+application = import_module(sys.argv[1]).application
+imported = time.perf_counter()
+
+status = {}
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/current-user/', 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+    'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0), 'wsgi.multithread': False,
+    'wsgi.multiprocess': False, 'wsgi.run_once': False,
+}
+b''.join(application(environ, lambda s, h, e=None: status.setdefault('code', int(s.split()[0]))))
+responded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (responded - imported) * 1000,
+    'status': status.get('code'),
+    'modules': len(sys.modules),
+    'dateutil_loaded': 'dateutil' in sys.modules,
+}))
+"""
+
+DEFAULT_PROFILES = [
+    'event_scheduler.settings:event_scheduler.wsgi',
+    'event_scheduler.settings_api:event_scheduler.wsgi_api',
+]
+
+
+class Command(BaseCommand):
+    """
+    Measure worker cold start for one or more settings profiles.
+
+    Each run starts a fresh interpreter, times the import of the WSGI entry point
+    and the first (unauthenticated, database-free) response, and the whole
+    process wall time. Results are printed as JSON.
+    """
+    help = "Benchmark import time and time to first response per settings profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'profiles',
+            nargs='*',
+            default=DEFAULT_PROFILES,
+            help="Profiles as <settings module>:<wsgi module> (default: full and API-only profile)."
+        )
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts per profile (default: 5).")
+
+    def handle(self, *args, **options):
+        if options['runs'] <= 0:
+            raise CommandError("--runs must be a positive integer.")
+
+        report = {}
+        for profile in options['profiles']:
+            settings_module, _, wsgi_module = profile.partition(':')
+            if not wsgi_module:
+                raise CommandError(f"Profile '{profile}' must be <settings module>:<wsgi module>.")
+            runs = [self.cold_start(settings_module, wsgi_module) for _ in range(options['runs'])]
+            report[settings_module] = {
+                'wsgi': wsgi_module,
+                'runs': options['runs'],
+                'status': runs[0]['status'],
+                'modules': runs[0]['modules'],
+                'dateutil_loaded': runs[0]['dateutil_loaded'],
+                **{
+                    f'{key}_median': round(statistics.median(run[key] for run in runs), 2)
+                    for key in ('import_ms', 'first_response_ms', 'process_ms')
+                },
+            }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def cold_start(self, settings_module, wsgi_module):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module}
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE, wsgi_module],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        if completed.returncode != 0:
+            raise CommandError(f"Profile {settings_module} failed to start:\n{completed.stderr}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result['process_ms'] = elapsed
+        return result
+
@@ -0,0 +1,129 @@
+import json
+import random
+import statistics
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from events.models import Event, RecurrenceRule
+from events.recurrence import occurrence_times, series_key, window_dates
+from events.timezones import UTC_NAME, get_zone, zone_year
+
+# Users' zones: DST in both hemispheres, half-hour offsets and zones without DST
+ZONES = (
+    'Europe/Berlin', 'America/New_York', 'America/Los_Angeles', 'America/Sao_Paulo', 'Australia/Sydney',
+    'Australia/Lord_Howe', 'Asia/Kolkata', 'Asia/Tokyo', 'Pacific/Auckland', 'Africa/Cairo',
+)
+RULES = (
+    {'frequency': 'DAILY', 'interval': 1},
+    {'frequency': 'WEEKLY', 'interval': 1, 'weekdays': ['MON', 'WED', 'FRI']},
+    {'frequency': 'MONTHLY', 'interval': 1, 'weekday': 'TUE', 'ordinal': 2},
+)
+
+
+class Command(BaseCommand):
+    """
+    Measure recurrence expansion for users in mixed time zones.
+
+    Builds unsaved recurring events for synthetic users, each in one of ZONES,
+    and expands a window in-process (no database) three ways: with every event
+    in UTC, in the users' zones through the cached transition tables, and in
+    the users' zones converting each occurrence through `zoneinfo` directly.
+    The last one is the reference: its results are compared with the cached
+    tables. Building the tables from a cold cache is reported separately.
+    Results are printed as JSON.
+    """
+    help = "Benchmark time zone aware recurrence expansion over users in mixed zones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Synthetic users (default: 200).")
+        parser.add_argument('--series', type=int, default=5, help="Recurring events per user (default: 5).")
+        parser.add_argument('--days', type=int, default=365, help="Length of the expanded window in days (default: 365).")
+        parser.add_argument('--runs', type=int, default=5, help="Runs per variant (default: 5).")
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['series'], options['days'], options['runs']) <= 0:
+            raise CommandError("--users, --series, --days and --runs must be positive integers.")
+
+        start_date = timezone.now().date()
+        end_date = start_date + timedelta(days=options['days'])
+        events = self.build(options['users'], options['series'])
+        utc_events = [self.in_zone(event, UTC_NAME) for event in events]
+
+        report = {'cold_tables': self.measure_tables(start_date, end_date)}
+        variants = (
+            ('utc', lambda: self.expand(utc_events, start_date, end_date)),
+            ('mixed_cached', lambda: self.expand(events, start_date, end_date)),
+            ('mixed_zoneinfo', lambda: self.expand_zoneinfo(events, start_date, end_date)),
+        )
+        results = {}
+        for name, expand in variants:
+            timings = []
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                results[name] = expand()
+                timings.append((time.perf_counter() - started) * 1000)
+            median = statistics.median(timings)
+            report[name] = {
+                'occurrences': len(results[name]),
+                'ms_median': round(median, 3),
+                'us_per_occurrence': round(median * 1000 / max(len(results[name]), 1), 3),
+            }
+        report['mismatches'] = sum(a != b for a, b in zip(results['mixed_cached'], results['mixed_zoneinfo']))
+        if len(results['mixed_cached']) != len(results['mixed_zoneinfo']) or report['mismatches']:
+            raise CommandError(f"Cached tables disagree with zoneinfo: {json.dumps(report)}")
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def build(self, users, series):
+        rules = [RecurrenceRule(**fields) for fields in RULES]
+        base = timezone.now().replace(minute=0, second=0, microsecond=0)
+        events = []
+        for user_id in range(1, users + 1):
+            zone = random.choice(ZONES)
+            for i in range(series):
+                start = base - timedelta(days=random.randint(0, 365), hours=random.randint(0, 23))
+                events.append(Event(
+                    pk=len(events) + 1, user_id=user_id, title=f'Series {i}', start_time=start,
+                    end_time=start + timedelta(minutes=45), is_recurring=True, time_zone=zone,
+                    recurrence_rule=random.choice(rules)
+                ))
+        return events
+
+    def in_zone(self, event, zone):
+        return Event(
+            pk=event.pk, user_id=event.user_id, title=event.title, start_time=event.start_time,
+            end_time=event.end_time, is_recurring=True, time_zone=zone, recurrence_rule=event.recurrence_rule
+        )
+
+    def expand(self, events, start_date, end_date):
+        return [times for event in events for times in occurrence_times(event, start_date, end_date)]
+
+    def expand_zoneinfo(self, events, start_date, end_date):
+        """Same occurrences, converting every wall time through `zoneinfo`."""
+        expanded = []
+        for event in events:
+            zone = get_zone(event.time_zone)
+            first_wall = event.start_time.astimezone(zone)
+            first_date = first_wall.date()
+            clock = first_wall.replace(microsecond=0).time()
+            duration = event.end_time - event.start_time
+            dates = window_dates(*series_key(event.recurrence_rule, first_date), start_date, end_date)
+            for day in dates[bisect_left(dates, first_date):]:
+                start = datetime.combine(day, clock, tzinfo=zone).astimezone(dt_timezone.utc)
+                expanded.append((start, start + duration))
+        return expanded
+
+    def measure_tables(self, start_date, end_date):
+        """Build every zone's tables for the window's years from a cold cache."""
+        zone_year.cache_clear()
+        started = time.perf_counter()
+        tables = 0
+        for name in ZONES:
+            for year in range(start_date.year, end_date.year + 1):
+                zone_year(name, year)
+                tables += 1
+        elapsed = (time.perf_counter() - started) * 1000
+        return {'tables': tables, 'ms': round(elapsed, 3), 'ms_per_table': round(elapsed / tables, 3)}
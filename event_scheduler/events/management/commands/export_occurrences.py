@@ -0,0 +1,203 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+COLUMNS = ['user_id', 'event_id', 'title', 'location', 'start_time', 'end_time', 'recurring', 'archived']
+
+# Rows fetched per database round trip while streaming a chunk
+FETCH_SIZE = 2000
+
+
+def init_worker():
+    """Set up Django in a worker process (needed when workers are spawned, not forked)."""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'event_scheduler.settings')
+        django.setup()
+
+
+def iter_rows(querysets, start_date, end_date):
+    """
+    Yield one row per occurrence within the date range.
+
+    Events are streamed from the database in batches of FETCH_SIZE, so memory
+    does not grow with the number of events.
+    """
+    from events.recurrence import occurrence_times
+    from events.timezones import local_date
+
+    for queryset, archived in querysets:
+        events = (
+            queryset.in_window(start_date, end_date)
+            .select_related('recurrence_rule')
+            .order_by('user_id', 'start_time')
+            .iterator(chunk_size=FETCH_SIZE)
+        )
+        for event in events:
+            if event.is_recurring and event.recurrence_rule:
+                times = occurrence_times(event, start_date, end_date)
+            elif start_date <= local_date(event) <= end_date:
+                times = [(event.start_time, event.end_time)]
+            else:
+                continue
+            for start, end in times:
+                yield [
+                    event.user_id, event.pk, event.title, event.location,
+                    start.isoformat(), end.isoformat(), event.is_recurring, archived
+                ]
+
+
+def export_chunk(index, first_user_id, last_user_id, start_date, end_date, output, fmt, include_archived):
+    """
+    Write the occurrences of users first_user_id..last_user_id to one compressed shard.
+
+    Runs in a worker process; returns the shard's manifest entry.
+    """
+    from events.models import ArchivedEvent, Event
+    from events.sharding import get_shards
+
+    querysets = []
+    for alias in get_shards():
+        querysets.append((Event.objects.using(alias).filter(user__gte=first_user_id, user__lte=last_user_id), False))
+        if include_archived:
+            querysets.append(
+                (ArchivedEvent.objects.using(alias).filter(user__gte=first_user_id, user__lte=last_user_id), True)
+            )
+
+    name = f'occurrences-{index:05d}.{fmt}.gz'
+    path = os.path.join(output, name)
+    rows = 0
+    with gzip.open(path, 'wt', newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            writer = csv.writer(handle)
+            writer.writerow(COLUMNS)
+            for row in iter_rows(querysets, start_date, end_date):
+                writer.writerow(row)
+                rows += 1
+        else:
+            for row in iter_rows(querysets, start_date, end_date):
+                handle.write(json.dumps(dict(zip(COLUMNS, row))) + '\n')
+                rows += 1
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    connections.close_all()
+    return {
+        'file': name,
+        'first_user_id': first_user_id,
+        'last_user_id': last_user_id,
+        'rows': rows,
+        'bytes': os.path.getsize(path),
+        'sha256': digest.hexdigest(),
+    }
+
+
+class Command(BaseCommand):
+    """
+    Export every occurrence of every user within a date range.
+
+    Users are partitioned into id-range chunks, which a process pool expands with
+    the same recurrence logic as the API. Each chunk is streamed into its own
+    gzip-compressed CSV or JSONL shard, so worker memory stays flat however many
+    events a chunk has. A `manifest.json` lists the shards with their row counts
+    and checksums.
+    """
+    help = "Export all occurrences of all users to compressed CSV/JSONL shards in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', required=True, help="Directory for the shards and the manifest.")
+        parser.add_argument('--start-date', type=date.fromisoformat, help="First day (default: today).")
+        parser.add_argument('--end-date', type=date.fromisoformat, help="Last day (default: one year after the first).")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv', help="Shard format (default: csv).")
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help="Worker processes (default: number of CPUs; 0 runs in this process)."
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help="Users per shard (default: 500).")
+        parser.add_argument('--include-archived', action='store_true', help="Also export archived events.")
+
+    def handle(self, *args, **options):
+        start_date = options['start_date'] or timezone.now().date()
+        end_date = options['end_date'] or start_date + timedelta(days=365)
+        if end_date < start_date:
+            raise CommandError("--end-date cannot be before --start-date.")
+        if options['chunk_size'] <= 0 or options['workers'] < 0:
+            raise CommandError("--chunk-size must be positive and --workers cannot be negative.")
+        output = options['output']
+        os.makedirs(output, exist_ok=True)
+
+        chunks = list(self.user_ranges(options['chunk_size']))
+        shared = (start_date, end_date, output, options['format'], options['include_archived'])
+        started = time.perf_counter()
+
+        if options['workers'] == 0:
+            shards = [self.report(export_chunk(index, *ids, *shared)) for index, ids in enumerate(chunks)]
+        else:
+            # Workers open their own connections; forked copies of ours must not be shared
+            connections.close_all()
+            shards = []
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as executor:
+                pending = set()
+                for index, ids in enumerate(chunks):
+                    # Keep the queue short so results stream in and memory stays flat
+                    if len(pending) >= options['workers'] * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        shards.extend(self.report(future.result()) for future in done)
+                    pending.add(executor.submit(export_chunk, index, *ids, *shared))
+                shards.extend(self.report(future.result()) for future in wait(pending).done)
+
+        elapsed = time.perf_counter() - started
+        shards.sort(key=lambda shard: shard['file'])
+        rows = sum(shard['rows'] for shard in shards)
+        manifest = {
+            'generated_at': timezone.now().isoformat(),
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'format': options['format'],
+            'compression': 'gzip',
+            'columns': COLUMNS,
+            'include_archived': options['include_archived'],
+            'workers': options['workers'],
+            'rows': rows,
+            'seconds': round(elapsed, 3),
+            'shards': shards,
+        }
+        with open(os.path.join(output, 'manifest.json'), 'w') as handle:
+            json.dump(manifest, handle, indent=2)
+
+        rate = rows / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {rows} occurrence(s) in {len(shards)} shard(s) in {elapsed:.1f}s ({rate:.0f} rows/s)."
+        ))
+
+    def user_ranges(self, chunk_size):
+        """Yield (first_user_id, last_user_id) covering `chunk_size` users each."""
+        ids = User.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=10000)
+        chunk = []
+        for user_id in ids:
+            chunk.append(user_id)
+            if len(chunk) == chunk_size:
+                yield chunk[0], chunk[-1]
+                chunk = []
+        if chunk:
+            yield chunk[0], chunk[-1]
+
+    def report(self, shard):
+        self.stdout.write(f"{shard['file']}: {shard['rows']} row(s), users {shard['first_user_id']}-{shard['last_user_id']}")
+        return shard
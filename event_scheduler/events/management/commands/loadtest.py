@@ -0,0 +1,340 @@
+import io
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+OPERATIONS = ('list', 'create', 'update', 'delete')
+USERNAME_PREFIX = 'loadtest-'
+PASSWORD = 'loadtest-password'
+
+
+class WSGITransport:
+    """
+    Calls the project's WSGI application in-process, without a socket.
+    """
+    name = 'wsgi'
+
+    def __init__(self):
+        from event_scheduler.wsgi import application
+        self.application = application
+
+    def request(self, method, path, body=None, token=None):
+        split = urlsplit(path)
+        payload = json.dumps(body).encode() if body is not None else b''
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': split.path,
+            'QUERY_STRING': split.query,
+            'HTTP_HOST': 'localhost',
+            'SERVER_NAME': 'localhost',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.input': io.BytesIO(payload),
+        }
+        if token:
+            environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        setup_testing_defaults(environ)
+
+        status_holder = {}
+
+        def start_response(status, headers, exc_info=None):
+            status_holder['status'] = int(status.split(' ', 1)[0])
+
+        result = self.application(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return status_holder['status'], content
+
+
+class HTTPTransport:
+    """
+    Sends real HTTP requests to an already running server.
+    """
+    name = 'http'
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
+
+
+class SyntheticUser:
+    """
+    A load-test user with its token and the ids of the events it created.
+    """
+
+    def __init__(self, username):
+        self.username = username
+        self.token = None
+        self.event_ids = []
+        self.lock = threading.Lock()
+
+    def take_event_id(self, remove=False):
+        with self.lock:
+            if not self.event_ids:
+                return None
+            if remove:
+                return self.event_ids.pop(random.randrange(len(self.event_ids)))
+            return random.choice(self.event_ids)
+
+    def add_event_id(self, event_id):
+        with self.lock:
+            self.event_ids.append(event_id)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Command(BaseCommand):
+    """
+    End-to-end load driver for the API.
+
+    Authenticates synthetic users through `/api/token/` and replays a weighted mix
+    of list/create/update/delete calls, either in-process through the WSGI app or
+    against a running server. Prints throughput and latency percentiles per
+    endpoint as JSON.
+
+    In-process, the synthetic users are created in the local database. Against a
+    running server they are registered through `/api/register/` instead (and
+    reused by later runs); `--cleanup` then deletes only their events, through
+    the API.
+    """
+    help = "Replay a mix of API calls with a thread pool and report latency percentiles as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Number of synthetic users (default: 10).")
+        parser.add_argument('--requests', type=int, default=1000, help="Total number of API calls (default: 1000).")
+        parser.add_argument('--concurrency', type=int, default=8, help="Worker threads (default: 8).")
+        parser.add_argument(
+            '--mix',
+            default='list=60,create=20,update=10,delete=10',
+            help="Weighted operation mix (default: list=60,create=20,update=10,delete=10)."
+        )
+        parser.add_argument(
+            '--base-url',
+            default=None,
+            help="Target a running server (e.g. http://localhost:8000) instead of the in-process WSGI app."
+        )
+        parser.add_argument('--window-days', type=int, default=31, help="Date window used by list calls (default: 31).")
+        parser.add_argument('--seed', type=int, default=None, help="Random seed for a reproducible mix.")
+        parser.add_argument('--output', default=None, help="Also write the JSON report to this file.")
+        parser.add_argument('--cleanup', action='store_true', help="Delete the synthetic users and their events afterwards.")
+
+    def handle(self, *args, **options):
+        if options['users'] <= 0 or options['requests'] <= 0 or options['concurrency'] <= 0:
+            raise CommandError("--users, --requests and --concurrency must be positive integers.")
+        mix = self.parse_mix(options['mix'])
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+
+        transport = HTTPTransport(options['base_url']) if options['base_url'] else WSGITransport()
+        self.window_days = options['window_days']
+        self.samples = {name: [] for name in ('token', 'cleanup') + OPERATIONS}
+        self.errors = {name: 0 for name in self.samples}
+        self.samples_lock = threading.Lock()
+
+        users = self.prepare_users(transport, options['users'], options['concurrency'])
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(lambda user: self.authenticate(transport, user), users))
+            self.close_thread_connections(pool, options['concurrency'])
+        users = [user for user in users if user.token]
+        if not users:
+            raise CommandError("No synthetic user could obtain a token.")
+
+        # Only the replay phase counts towards throughput
+        for name in OPERATIONS:
+            self.samples[name] = []
+        operations = random.choices(list(mix), weights=list(mix.values()), k=options['requests'])
+        plan = [(operation, users[i % len(users)]) for i, operation in enumerate(operations)]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(lambda task: self.run_operation(transport, *task), plan))
+            elapsed = time.perf_counter() - started
+            self.close_thread_connections(pool, options['concurrency'])
+
+        report = self.build_report(transport, len(users), options, elapsed)
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output)
+
+        if options['cleanup']:
+            self.cleanup(transport, users)
+
+    def parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in OPERATIONS:
+                raise CommandError(f"Unknown operation '{name}' in --mix. Must be one of {list(OPERATIONS)}.")
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"Invalid weight for '{name}' in --mix.")
+            if not math.isfinite(mix[name]) or mix[name] < 0:
+                raise CommandError(f"The weight for '{name}' in --mix must be a non-negative number.")
+        if not any(weight > 0 for weight in mix.values()):
+            raise CommandError("--mix needs at least one positive weight.")
+        return mix
+
+    def prepare_users(self, transport, count, concurrency):
+        """Synthetic users: local rows for the WSGI transport, registered through the API otherwise."""
+        users = [SyntheticUser(f'{USERNAME_PREFIX}{i}') for i in range(count)]
+        if transport.name != WSGITransport.name:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(lambda user: self.register(transport, user), users))
+            return users
+        for user in users:
+            account, created = User.objects.get_or_create(
+                username=user.username, defaults={'email': f'{user.username}@example.com'}
+            )
+            if created or not account.check_password(PASSWORD):
+                account.set_password(PASSWORD)
+                account.save(update_fields=['password'])
+        return users
+
+    def register(self, transport, user):
+        # 400 means the user exists from an earlier run; authentication reports real failures
+        transport.request('POST', '/api/register/', body={
+            'username': user.username, 'password': PASSWORD, 'email': f'{user.username}@example.com'
+        })
+
+    def close_thread_connections(self, pool, workers):
+        """Close the database connections the pool's threads opened (they are per thread)."""
+        # Every task waits for the others, so each worker thread runs exactly one
+        barrier = threading.Barrier(workers)
+
+        def close(_):
+            barrier.wait()
+            connections.close_all()
+
+        list(pool.map(close, range(workers)))
+
+    def cleanup(self, transport, users):
+        if transport.name == WSGITransport.name:
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            return
+        # Users cannot be deleted through the API; remove the events they created
+        for user in users:
+            if user.event_ids:
+                self.timed(
+                    'cleanup', transport, 'POST', '/api/events/bulk-delete/',
+                    body={'ids': user.event_ids}, token=user.token
+                )
+
+    def timed(self, name, transport, method, path, body=None, token=None, expected=(200,)):
+        started = time.perf_counter()
+        try:
+            status, content = transport.request(method, path, body=body, token=token)
+        except OSError:
+            status, content = None, b''
+        latency = (time.perf_counter() - started) * 1000
+        with self.samples_lock:
+            self.samples[name].append(latency)
+            if status not in expected:
+                self.errors[name] += 1
+        return status, content
+
+    def authenticate(self, transport, user):
+        status, content = self.timed(
+            'token', transport, 'POST', '/api/token/',
+            body={'username': user.username, 'password': PASSWORD}
+        )
+        if status == 200:
+            user.token = json.loads(content)['access']
+
+    def event_payload(self):
+        start = timezone.now() + timedelta(days=random.randint(1, self.window_days), hours=random.randint(0, 23))
+        return {
+            'title': 'Load test event',
+            'description': 'Generated by the loadtest command',
+            'location': 'Room 1',
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(hours=1)).isoformat(),
+            'is_recurring': False,
+        }
+
+    def run_operation(self, transport, operation, user):
+        if operation in ('update', 'delete'):
+            event_id = user.take_event_id(remove=operation == 'delete')
+            if event_id is None:
+                # Nothing to modify yet, so grow the user's calendar instead
+                operation = 'create'
+
+        if operation == 'list':
+            start = timezone.now().date()
+            end = start + timedelta(days=self.window_days)
+            self.timed('list', transport, 'GET', f'/api/events/?start_date={start}&end_date={end}', token=user.token)
+        elif operation == 'create':
+            status, content = self.timed(
+                'create', transport, 'POST', '/api/events/',
+                body=self.event_payload(), token=user.token, expected=(201,)
+            )
+            if status == 201:
+                user.add_event_id(json.loads(content)['id'])
+        elif operation == 'update':
+            self.timed('update', transport, 'PUT', f'/api/events/{event_id}/', body=self.event_payload(), token=user.token)
+        elif operation == 'delete':
+            self.timed('delete', transport, 'DELETE', f'/api/events/delete/{event_id}/', token=user.token)
+
+    def build_report(self, transport, user_count, options, elapsed):
+        endpoints = {}
+        total = 0
+        for name, latencies in self.samples.items():
+            if not latencies:
+                continue
+            ordered = sorted(latencies)
+            if name in OPERATIONS:
+                total += len(ordered)
+            endpoints[name] = {
+                'count': len(ordered),
+                'errors': self.errors[name],
+                'mean_ms': round(sum(ordered) / len(ordered), 3),
+                'p50_ms': round(percentile(ordered, 50), 3),
+                'p95_ms': round(percentile(ordered, 95), 3),
+                'p99_ms': round(percentile(ordered, 99), 3),
+                'max_ms': round(ordered[-1], 3),
+            }
+        return {
+            'transport': transport.name,
+            'users': user_count,
+            'concurrency': options['concurrency'],
+            'requests': total,
+            'duration_s': round(elapsed, 3),
+            'throughput_rps': round(total / elapsed, 2) if elapsed else None,
+            'endpoints': endpoints,
+        }
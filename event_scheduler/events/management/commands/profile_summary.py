@@ -0,0 +1,69 @@
+import glob
+import os
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from events.profiling import PROFILE_SUFFIX, read_profile
+
+
+class Command(BaseCommand):
+    """
+    Summarize profiles written by `ProfilingMiddleware`.
+
+    Prints the profiled requests per endpoint and the hottest functions, by self
+    time (samples where the function was running) and by total time (samples
+    where it was anywhere on the stack).
+    """
+    help = "Show the hottest functions in the sampled request profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Profile directory (default: settings.PROFILE_DIR).")
+        parser.add_argument('--top', type=int, default=20, help="Number of functions to list (default: 20).")
+        parser.add_argument('--endpoint', help="Only include profiles of this endpoint (URL name).")
+        parser.add_argument('--min-duration-ms', type=float, default=0, help="Only include requests at least this slow.")
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or getattr(settings, 'PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+        if options['top'] <= 0:
+            raise CommandError("--top must be a positive integer.")
+        paths = sorted(glob.glob(os.path.join(directory, '*' + PROFILE_SUFFIX)))
+        if not paths:
+            raise CommandError(f"No profiles found in {directory}.")
+
+        self_samples = Counter()
+        total_samples = Counter()
+        endpoints = defaultdict(list)
+        sample_count = 0
+        for path in paths:
+            tags, samples = read_profile(path)
+            if options['endpoint'] and tags.get('endpoint') != options['endpoint']:
+                continue
+            if tags.get('duration_ms', 0) < options['min_duration_ms']:
+                continue
+            endpoints[tags.get('endpoint', 'unknown')].append(tags)
+            for stack, count in samples.items():
+                frames = stack.split(';')
+                self_samples[frames[-1]] += count
+                # Count recursive functions once per stack
+                for frame in set(frames):
+                    total_samples[frame] += count
+                sample_count += count
+
+        if not sample_count:
+            raise CommandError("No profiles match the given filters.")
+
+        self.stdout.write(f"{sum(map(len, endpoints.values()))} request(s), {sample_count} sample(s)\n")
+        self.stdout.write(f"{'requests':>8}  {'avg ms':>9}  {'max ms':>9}  endpoint")
+        for endpoint, requests in sorted(endpoints.items(), key=lambda item: -len(item[1])):
+            durations = [tags.get('duration_ms', 0) for tags in requests]
+            self.stdout.write(
+                f"{len(requests):>8}  {sum(durations) / len(durations):>9.1f}  {max(durations):>9.1f}  {endpoint}"
+            )
+
+        for title, counter in (('self', self_samples), ('total', total_samples)):
+            self.stdout.write(f"\nTop {options['top']} functions by {title} samples")
+            self.stdout.write(f"{'samples':>8}  {'share':>6}  function")
+            for frame, count in counter.most_common(options['top']):
+                self.stdout.write(f"{count:>8}  {count / sample_count:>6.1%}  {frame}")
@@ -0,0 +1,112 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+
+from events.models import Event
+from events.sharding import SHARD_ID_RANGE, get_shards, move_user, shard_for_user
+
+
+class Command(BaseCommand):
+    """
+    Move users between event shards.
+
+    Moves a single user (`--user`/`--to`), or with `--auto` repeatedly moves a
+    user from the fullest to the emptiest shard (by event count) until the
+    shards are within `--tolerance` of each other. `--reserve-id-ranges` gives
+    every shard its own event id range so moved rows never collide. Moves can
+    be repeated, so running the command again finishes an interrupted one.
+    """
+    help = "Move users between event shards and reserve per-shard event id ranges."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Id of a user to move (requires --to).")
+        parser.add_argument('--to', help="Target database alias for --user.")
+        parser.add_argument('--auto', action='store_true', help="Balance event counts across all shards.")
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.1,
+            help="Allowed difference between the fullest and emptiest shard, relative to the mean (default: 0.1)."
+        )
+        parser.add_argument('--max-moves', type=int, default=100, help="Stop after this many moves (default: 100).")
+        parser.add_argument('--dry-run', action='store_true', help="Only report the moves that would be made.")
+        parser.add_argument(
+            '--reserve-id-ranges',
+            action='store_true',
+            help=f"Start each shard's event ids at index * {SHARD_ID_RANGE} (PostgreSQL only)."
+        )
+
+    def handle(self, *args, **options):
+        shards = get_shards()
+        if options['reserve_id_ranges']:
+            self.reserve_id_ranges(shards)
+
+        if options['user'] is not None:
+            if options['to'] not in shards:
+                raise CommandError(f"--to must be one of {shards}.")
+            if not User.objects.filter(pk=options['user']).exists():
+                raise CommandError(f"User {options['user']} does not exist.")
+            self.move(options['user'], options['to'], options['dry_run'])
+        elif options['to']:
+            raise CommandError("--to requires --user.")
+
+        if options['auto']:
+            self.balance(shards, options['tolerance'], options['max_moves'], options['dry_run'])
+
+    def move(self, user_id, target, dry_run):
+        source = shard_for_user(user_id)
+        if dry_run:
+            self.stdout.write(f"Would move user {user_id} from {source} to {target}.")
+            return
+        try:
+            moved = move_user(user_id, target)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(f"Moved user {user_id} from {source} to {target} ({moved} event(s)).")
+
+    def balance(self, shards, tolerance, max_moves, dry_run):
+        if len(shards) < 2:
+            self.stdout.write("Only one shard configured; nothing to balance.")
+            return
+
+        users = {
+            alias: dict(
+                Event.objects.using(alias).values_list('user_id').annotate(count=Count('id')).order_by()
+            )
+            for alias in shards
+        }
+        moves = 0
+        while moves < max_moves:
+            load = {alias: sum(counts.values()) for alias, counts in users.items()}
+            fullest = max(load, key=load.get)
+            emptiest = min(load, key=load.get)
+            gap = load[fullest] - load[emptiest]
+            if gap <= tolerance * sum(load.values()) / len(load):
+                break
+            # Largest user whose move narrows the gap
+            candidates = [(count, user_id) for user_id, count in users[fullest].items() if count <= gap / 2]
+            if not candidates:
+                break
+            count, user_id = max(candidates)
+            self.move(user_id, emptiest, dry_run)
+            users[emptiest][user_id] = users[fullest].pop(user_id)
+            moves += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{moves} move(s) {'planned' if dry_run else 'done'}."))
+
+    def reserve_id_ranges(self, shards):
+        for index, alias in enumerate(shards):
+            if index == 0:
+                continue  # The first shard keeps the ids it already uses
+            connection = connections[alias]
+            if connection.vendor != 'postgresql':
+                self.stderr.write(f"Skipping {alias}: id ranges can only be reserved on PostgreSQL.")
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT setval(pg_get_serial_sequence('events_event', 'id'), "
+                    "GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM events_event)))",
+                    [index * SHARD_ID_RANGE]
+                )
+            self.stdout.write(f"{alias}: event ids start above {index * SHARD_ID_RANGE}.")
@@ -0,0 +1,166 @@
+import os
+import random
+import re
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from . import replicas
+from .profiling import TAGS_ATTRIBUTE, StackSampler, write_profile
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+re_accepts_brotli = re.compile(r'\bbr\b')
+
+
+def compress_brotli(content, quality, max_random_bytes):
+    """
+    Brotli-compress `content`, with 1 to `max_random_bytes` random bytes added.
+
+    The same BREACH mitigation Django applies to gzip (random bytes in the gzip
+    header), so the response length does not depend on the content alone. The
+    bytes go into a metadata meta-block, which decoders skip (RFC 7932, 9.2).
+    Flushing the empty stream first ends the stream header on a byte boundary,
+    where the metadata block can be spliced in.
+    """
+    compressor = brotli.Compressor(quality=quality)
+    header = compressor.process(b'') + compressor.flush()
+    padding = 1 + secrets.randbelow(max_random_bytes)
+    # ISLAST=0, MNIBBLES=0 (code 3), reserved bit, MSKIPBYTES=1, MSKIPLEN-1, padded to 16 bits
+    metadata = ((3 << 1) | (1 << 4) | ((padding - 1) << 6)).to_bytes(2, 'little')
+    return b''.join([
+        header, metadata, secrets.token_bytes(padding), compressor.process(content), compressor.finish()
+    ])
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress large responses with Brotli or gzip, negotiated on Accept-Encoding.
+
+    Brotli is preferred when the client accepts it and the optional `brotli`
+    package is installed; otherwise Django's gzip handling applies. Responses
+    smaller than `COMPRESSION_MIN_SIZE` bytes are sent as-is, since small JSON
+    bodies gain little and still pay the compression cost. Both encodings add
+    up to `max_random_bytes` random bytes against BREACH.
+    """
+
+    def process_response(self, request, response):
+        min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        if response.streaming or len(response.content) < min_size:
+            return response
+        if brotli is None or response.has_header('Content-Encoding'):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        compressed = compress_brotli(
+            response.content,
+            quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4),
+            max_random_bytes=self.max_random_bytes
+        )
+        # Return the original response if compression doesn't save space
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(response.content))
+        # A compressed body is not byte-for-byte equal to the original
+        if response.has_header('ETag'):
+            response.headers['ETag'] = re.sub(r'^"', 'W/"', response.headers['ETag'])
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile slow or randomly picked requests with a stack sampler.
+
+    While a request runs, its thread's stack is sampled every
+    `PROFILE_INTERVAL_MS`. Requests slower than `PROFILE_SLOW_REQUEST_MS`, plus a
+    random `PROFILE_SAMPLE_RATE` fraction of all requests, are written to
+    `PROFILE_DIR` as collapsed stacks tagged with the endpoint, user and any
+    tags the view added (see `events.profiling.tag`). Only the newest
+    `PROFILE_MAX_FILES` profiles are kept. Disabled when neither a threshold nor
+    a sample rate is configured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'PROFILE_SLOW_REQUEST_MS', None)
+        self.rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+        if self.threshold is None and not self.rate:
+            raise MiddlewareNotUsed
+        self.directory = getattr(settings, 'PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+        self.max_files = getattr(settings, 'PROFILE_MAX_FILES', 200)
+        self.sampler = StackSampler(getattr(settings, 'PROFILE_INTERVAL_MS', 5) / 1000)
+
+    def __call__(self, request):
+        picked = random.random() < self.rate
+        if self.threshold is None and not picked:
+            return self.get_response(request)
+
+        tags = {}
+        setattr(request, TAGS_ATTRIBUTE, tags)
+        thread_id = threading.get_ident()
+        samples = self.sampler.start(thread_id)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            self.sampler.stop(thread_id)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        slow = self.threshold is not None and duration_ms >= self.threshold
+        if samples and (slow or picked):
+            self.save(request, response, samples, tags, duration_ms, 'slow' if slow else 'random')
+        return response
+
+    def save(self, request, response, samples, tags, duration_ms, reason):
+        match = request.resolver_match
+        endpoint = (match.view_name or match.route) if match else 'unresolved'
+        user = getattr(request, 'user', None)
+        tags = {
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'duration_ms': round(duration_ms, 3),
+            'reason': reason,
+            'samples': sum(samples.values()),
+            **tags,
+        }
+        name = f"{time.time_ns()}-{os.getpid()}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', endpoint)}"
+        write_profile(self.directory, name, samples, tags, self.max_files)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Keep a user's reads on the primaries for a short while after they write.
+
+    Any non-GET/HEAD/OPTIONS request by an authenticated user marks them (see
+    `events.replicas`). DRF sets `request.user` during the view, so this also
+    sees token-authenticated users. Disabled when no replicas are configured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and user is not None and user.is_authenticated:
+            replicas.mark_written(user.pk)
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 5.0 on 2026-10-19 15:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_recurrencerule_ordinal_recurrencerule_weekday'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEvent',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Id of the original event.', primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('location', models.CharField(blank=True, max_length=200, null=True)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('is_recurring', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'archived event',
+                'verbose_name_plural': 'archived events',
+                'ordering': ['start_time'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['user', 'start_time'], name='events_even_user_id_ae4b8d_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedevent',
+            name='recurrence_rule',
+            field=models.OneToOneField(blank=True, help_text='Recurrence rule of the archived series.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_event', to='events.recurrencerule'),
+        ),
+        migrations.AddField(
+            model_name='archivedevent',
+            name='user',
+            field=models.ForeignKey(help_text='Owner of the event.', on_delete=django.db.models.deletion.CASCADE, related_name='archived_events', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedevent',
+            index=models.Index(fields=['user', 'start_time'], name='events_arch_user_id_0491cb_idx'),
+        ),
+    ]
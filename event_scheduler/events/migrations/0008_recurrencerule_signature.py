@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-19 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_archivedevent_event_user_start_time_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='recurrence_rule',
+            field=models.ForeignKey(blank=True, help_text='Recurrence rule for recurring events (shared between events with the same rule).', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='events', to='events.recurrencerule'),
+        ),
+        migrations.AlterField(
+            model_name='archivedevent',
+            name='recurrence_rule',
+            field=models.ForeignKey(blank=True, help_text='Recurrence rule of the archived series.', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_events', to='events.recurrencerule'),
+        ),
+        migrations.AddField(
+            model_name='recurrencerule',
+            name='signature',
+            field=models.CharField(editable=False, max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0 on 2026-10-19 16:02
+
+from django.db import migrations
+
+WEEKDAY_ORDER = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+
+
+def signature(rule):
+    weekdays = sorted(rule.weekdays, key=WEEKDAY_ORDER.index) if rule.weekdays else []
+    return ':'.join([
+        rule.frequency,
+        str(rule.interval),
+        rule.end_date.isoformat() if rule.end_date else '',
+        ','.join(weekdays),
+        rule.weekday or '',
+        str(rule.ordinal or ''),
+    ])
+
+
+def intern_rules(apps, schema_editor):
+    """
+    Merge duplicate rules: every event is pointed at the oldest rule with the
+    same shape and the duplicates are deleted.
+    """
+    RecurrenceRule = apps.get_model('events', 'RecurrenceRule')
+    Event = apps.get_model('events', 'Event')
+    ArchivedEvent = apps.get_model('events', 'ArchivedEvent')
+    db = schema_editor.connection.alias
+
+    canonical = {}
+    for rule in RecurrenceRule.objects.using(db).order_by('pk').iterator():
+        key = signature(rule)
+        if key not in canonical:
+            canonical[key] = rule.pk
+            if rule.weekdays:
+                rule.weekdays = sorted(rule.weekdays, key=WEEKDAY_ORDER.index)
+            rule.signature = key
+            rule.save(update_fields=['weekdays', 'signature'])
+            continue
+        Event.objects.using(db).filter(recurrence_rule_id=rule.pk).update(recurrence_rule_id=canonical[key])
+        ArchivedEvent.objects.using(db).filter(recurrence_rule_id=rule.pk).update(recurrence_rule_id=canonical[key])
+        rule.delete()
+
+
+class Migration(migrations.Migration):
+    """
+    Runs on its own: deleting duplicates queues deferred foreign-key checks on
+    PostgreSQL, and the table cannot be altered until they have fired.
+    """
+
+    dependencies = [
+        ('events', '0008_recurrencerule_signature'),
+    ]
+
+    operations = [
+        migrations.RunPython(intern_rules, migrations.RunPython.noop),
+    ]
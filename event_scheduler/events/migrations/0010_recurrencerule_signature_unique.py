@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_intern_recurrence_rules'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recurrencerule',
+            name='signature',
+            field=models.CharField(editable=False, help_text='Canonical form of the rule shape; identical rules are stored once.', max_length=100, unique=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-19 15:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('events', '0010_recurrencerule_signature_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(help_text='Owner of the sharded data.', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='event_shard', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('database', models.CharField(help_text="Database alias (one of settings.EVENT_SHARDS) holding the user's data.", max_length=100)),
+            ],
+            options={
+                'verbose_name': 'user shard',
+                'verbose_name_plural': 'user shards',
+            },
+        ),
+        migrations.AlterField(
+            model_name='archivedevent',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, help_text='Owner of the event.', on_delete=django.db.models.deletion.CASCADE, related_name='archived_events', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, help_text='Owner of the event.', on_delete=django.db.models.deletion.CASCADE, related_name='events', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
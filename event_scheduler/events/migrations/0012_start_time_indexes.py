@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-19 15:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_usershard_user_db_constraint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedevent',
+            index=models.Index(fields=['start_time'], name='events_arch_start_t_dd33bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_time'], name='events_even_start_t_c2d277_idx'),
+        ),
+    ]
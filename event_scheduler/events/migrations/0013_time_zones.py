@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-19 15:55
+
+import django.db.models.deletion
+import events.timezones
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('events', '0012_start_time_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('user', models.OneToOneField(help_text='Owner of the preferences.', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='event_profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('time_zone', models.CharField(default='UTC', help_text="IANA time zone new events repeat in, e.g. 'America/New_York'.", max_length=64, validators=[events.timezones.validate_time_zone])),
+            ],
+            options={
+                'verbose_name': 'user profile',
+                'verbose_name_plural': 'user profiles',
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedevent',
+            name='time_zone',
+            field=models.CharField(default='UTC', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='time_zone',
+            field=models.CharField(default='UTC', help_text="IANA time zone the event repeats in (wall time), e.g. 'Europe/Berlin'.", max_length=64, validators=[events.timezones.validate_time_zone]),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-19 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_time_zones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usershard',
+            name='moving_to',
+            field=models.CharField(blank=True, help_text='Target database of a move in progress; writes are refused meanwhile.', max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='usershard',
+            name='previous_database',
+            field=models.CharField(blank=True, help_text='Source database of a finished move whose rows are not deleted yet.', max_length=100, null=True),
+        ),
+    ]
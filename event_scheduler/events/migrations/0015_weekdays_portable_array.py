@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-19 16:19
+
+import events.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_usershard_move_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recurrencerule',
+            name='weekdays',
+            field=events.fields.PortableArrayField(base_field=models.CharField(choices=[('MON', 'Monday'), ('TUE', 'Tuesday'), ('WED', 'Wednesday'), ('THU', 'Thursday'), ('FRI', 'Friday'), ('SAT', 'Saturday'), ('SUN', 'Sunday')], max_length=3), blank=True, help_text="Specific weekdays for WEEKLY recurrence (e.g., ['MON', 'WED']).", null=True, size=None),
+        ),
+    ]
@@ -1,11 +1,108 @@
+from datetime import datetime, time, timedelta
+
 from django.contrib.auth.models import User
-from django.db import models
-from django.contrib.postgres.fields import ArrayField
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .fields import PortableArrayField
+from .timezones import MAX_UTC_OFFSET, UTC_NAME, validate_time_zone, widen
+
+
+def rule_signature(frequency, interval=1, end_date=None, weekdays=None, weekday=None, ordinal=None):
+    """
+    Canonical text form of a recurrence rule shape, e.g. `WEEKLY:1:2025-12-31:MON,WED::`.
+
+    Weekdays are expected in canonical (Monday-first) order.
+    """
+    return ':'.join([
+        frequency,
+        str(interval),
+        end_date.isoformat() if end_date else '',
+        ','.join(weekdays or []),
+        weekday or '',
+        str(ordinal or ''),
+    ])
+
+
+def canonical_weekdays(weekdays):
+    """Weekday codes in Monday-first order, or None for an empty selection."""
+    if not weekdays:
+        return None
+    order = [choice[0] for choice in RecurrenceRule.WEEKDAY_CHOICES]
+    return sorted(weekdays, key=order.index)
+
+
+class RecurrenceRuleQuerySet(models.QuerySet):
+    """
+    Interning and clean-up of shared recurrence rules.
+    """
+
+    def intern(self, frequency, interval=1, end_date=None, weekdays=None, weekday=None, ordinal=None):
+        """
+        Return the single stored rule with this shape, creating it if needed.
+
+        Identical rules (e.g. "weekly on MON, WED") are stored once and shared by
+        every event that uses them, so rules must never be modified in place.
+
+        The rule row is locked (or freshly inserted) until the caller's
+        transaction ends, so `delete_orphaned()` cannot remove it before the
+        event using it is saved: wrap `intern()` and that save in one
+        `transaction.atomic()`.
+        """
+        fields = {
+            'frequency': frequency,
+            'interval': interval,
+            'end_date': end_date,
+            'weekdays': canonical_weekdays(weekdays),
+            'weekday': weekday,
+            'ordinal': ordinal,
+        }
+        signature = rule_signature(**fields)
+        with transaction.atomic(using=self.db):
+            for _ in range(3):
+                rule = self.select_for_update().filter(signature=signature).first()
+                if rule is not None:
+                    return rule
+                try:
+                    with transaction.atomic(using=self.db):
+                        return self.create(**fields)
+                except IntegrityError:
+                    continue  # Inserted concurrently; lock that row instead
+        raise IntegrityError(f"Could not intern recurrence rule {signature!r}")
+
+    def orphaned(self):
+        """Rules no longer referenced by any current or archived event."""
+        return self.filter(
+            ~models.Exists(Event.objects.filter(recurrence_rule=models.OuterRef('pk'))),
+            ~models.Exists(ArchivedEvent.objects.filter(recurrence_rule=models.OuterRef('pk')))
+        )
+
+    def delete_orphaned(self):
+        """
+        Delete the selected rules that are no longer referenced.
+
+        Returns the number of deleted rules. Candidates are locked first, which
+        waits for any transaction that has just interned one of them; the DELETE
+        then checks the references again, seeing that transaction's events.
+        Call it after the transaction that re-pointed events has committed, so
+        rule locks are never held across several rules.
+        """
+        with transaction.atomic(using=self.db):
+            candidates = list(self.orphaned().select_for_update().order_by('pk').values_list('pk', flat=True))
+            if not candidates:
+                return 0
+            # Referencing rows are checked in the same statement, so the PROTECT
+            # collector is not needed. `_raw_delete` is private Django API (a
+            # single DELETE without collecting related objects); BulkDeleteTests pins it.
+            return self.model.objects.using(self.db).filter(pk__in=candidates).orphaned()._raw_delete(using=self.db)
 
 
 class RecurrenceRule(models.Model):
     """
     Defines recurrence rules for events, including weekday selection and relative-date patterns.
+
+    Rules are interned by `signature` and shared between events; create them with
+    `RecurrenceRule.objects.intern()`.
     """
     FREQUENCY_CHOICES = (
         ('DAILY', 'Daily'),
@@ -43,7 +140,7 @@ class RecurrenceRule(models.Model):
         blank=True,
         help_text="Date when recurrence ends."
     )
-    weekdays = ArrayField(
+    weekdays = PortableArrayField(
         models.CharField(max_length=3, choices=WEEKDAY_CHOICES),
         null=True,
         blank=True,
@@ -62,6 +159,25 @@ class RecurrenceRule(models.Model):
         blank=True,
         help_text="Ordinal position for MONTHLY recurrence (e.g., 2 for second Friday)."
     )
+    signature = models.CharField(
+        max_length=100,
+        unique=True,
+        editable=False,
+        help_text="Canonical form of the rule shape; identical rules are stored once."
+    )
+
+    objects = RecurrenceRuleQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        """Keep `signature` in step with the rule's fields."""
+        self.weekdays = canonical_weekdays(self.weekdays)
+        self.signature = rule_signature(
+            self.frequency, self.interval, self.end_date, self.weekdays, self.weekday, self.ordinal
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'weekdays', 'signature'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         weekdays_str = f" on {', '.join(self.weekdays)}" if self.weekdays else ""
@@ -73,6 +189,76 @@ class RecurrenceRule(models.Model):
         verbose_name_plural = "recurrence rules"
 
 
+class UserScopedQuerySet(models.QuerySet):
+    """
+    Queries for rows owned by a single user, routed to that user's shard.
+    """
+
+    def for_user(self, user):
+        """
+        Rows of `user`, read from and written to the database holding them
+        (read from a replica of it inside `replicas.replica_reads()`).
+        """
+        from .replicas import read_database
+        from .sharding import shard_for_user
+
+        return self.using(read_database(shard_for_user(user))).filter(user=user)
+
+    def in_window(self, start_date, end_date):
+        """
+        Rows that can have occurrences within [start_date, end_date]: single
+        events starting in the range and series that have not ended before it.
+
+        Dates are local to each event's time zone, so the UTC bounds are widened
+        by the largest offset; callers filter the exact local dates.
+        """
+        after_end = widen(timezone.make_aware(datetime.combine(end_date, time.min)), timedelta(days=1) + MAX_UTC_OFFSET)
+        singles = models.Q(
+            recurrence_rule__isnull=True,
+            start_time__gte=widen(timezone.make_aware(datetime.combine(start_date, time.min)), -MAX_UTC_OFFSET)
+        )
+        series = models.Q(recurrence_rule__isnull=False) & (
+            models.Q(recurrence_rule__end_date__isnull=True) | models.Q(recurrence_rule__end_date__gte=start_date)
+        )
+        return self.filter(singles | series, start_time__lt=after_end)
+
+
+class EventQuerySet(UserScopedQuerySet):
+    """
+    Set-based operations on events that avoid per-row Python work.
+    """
+
+    def delete_with_rules(self):
+        """
+        Delete the selected events and the recurrence rules only they used.
+
+        Runs a constant number of queries inside one transaction, regardless of
+        how many events are selected. Returns the number of deleted events.
+        """
+        with transaction.atomic(using=self.db):
+            rule_ids = list(
+                self.filter(recurrence_rule__isnull=False).order_by().values_list('recurrence_rule_id', flat=True).distinct()
+            )
+            deleted, _ = self.delete()
+            if rule_ids:
+                # Shared rules survive as long as another event still uses them
+                RecurrenceRule.objects.using(self.db).filter(pk__in=rule_ids).delete_orphaned()
+        return deleted
+
+    def archivable(self, cutoff):
+        """
+        Events that are completely over before `cutoff`.
+
+        Single events qualify once they have ended; recurring events only once
+        their recurrence rule has ended.
+        """
+        return self.filter(
+            models.Q(recurrence_rule__isnull=True, end_time__lt=cutoff) |
+            # End dates are local to the event's zone
+            models.Q(recurrence_rule__end_date__lt=widen(cutoff, -MAX_UTC_OFFSET).date())
+        )
+
+
 class Event(models.Model):
     """
     Represents a calendar event, either single or recurring.
@@ -80,6 +266,7 @@ class Event(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_constraint=False,  # users live on the default database, events on their shard
         related_name="events",
         help_text="Owner of the event."
     )
@@ -108,21 +295,160 @@ class Event(models.Model):
         default=False,
         help_text="Indicates if event is recurring."
     )
-    recurrence_rule = models.OneToOneField(
+    time_zone = models.CharField(
+        max_length=64,
+        default=UTC_NAME,
+        validators=[validate_time_zone],
+        help_text="IANA time zone the event repeats in (wall time), e.g. 'Europe/Berlin'."
+    )
+    recurrence_rule = models.ForeignKey(
         RecurrenceRule,
-        on_delete=models.CASCADE,
+        on_delete=models.PROTECT,
         null=True,
         blank=True,
-        related_name="event",
-        help_text="Recurrence rule for recurring events."
+        related_name="events",
+        help_text="Recurrence rule for recurring events (shared between events with the same rule)."
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EventQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} ({self.start_time})"
 
     class Meta:
         ordering = ["start_time"]
+        indexes = [
+            models.Index(fields=["user", "start_time"]),
+            # Date ranges across all users, e.g. the admin's date hierarchy
+            models.Index(fields=["start_time"]),
+        ]
         verbose_name = "event"
         verbose_name_plural = "events"
+
+
+class ArchivedEvent(models.Model):
+    """
+    Finished events moved out of the hot `Event` table by `archive_events`.
+
+    Keeps the original event id and recurrence rule so archived rows can still be
+    served by the API when `include_archived` is requested.
+    """
+    ARCHIVED_FIELDS = (
+        'id', 'user_id', 'title', 'description', 'location', 'start_time', 'end_time',
+        'is_recurring', 'time_zone', 'recurrence_rule_id', 'created_at', 'updated_at'
+    )
+
+    id = models.BigIntegerField(
+        primary_key=True,
+        help_text="Id of the original event."
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_constraint=False,  # users live on the default database, events on their shard
+        related_name="archived_events",
+        help_text="Owner of the event."
+    )
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True, null=True)
+    location = models.CharField(max_length=200, blank=True, null=True)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    is_recurring = models.BooleanField(default=False)
+    time_zone = models.CharField(max_length=64, default=UTC_NAME)
+    recurrence_rule = models.ForeignKey(
+        RecurrenceRule,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="archived_events",
+        help_text="Recurrence rule of the archived series."
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = UserScopedQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.title} ({self.start_time}, archived)"
+
+    class Meta:
+        ordering = ["start_time"]
+        indexes = [
+            models.Index(fields=["user", "start_time"]),
+            models.Index(fields=["start_time"]),
+        ]
+        verbose_name = "archived event"
+        verbose_name_plural = "archived events"
+
+
+class UserShard(models.Model):
+    """
+    Shard map: the database holding a user's events, rules and archived events.
+
+    Stored on the default database next to the users. Rows are created on first
+    use and only change when `rebalance_shards` moves a user. While a move runs,
+    `moving_to` names the target and the user's writes are refused; once it has
+    switched, `previous_database` names the source until its rows are deleted.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="event_shard",
+        help_text="Owner of the sharded data."
+    )
+    database = models.CharField(
+        max_length=100,
+        help_text="Database alias (one of settings.EVENT_SHARDS) holding the user's data."
+    )
+    moving_to = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text="Target database of a move in progress; writes are refused meanwhile."
+    )
+    previous_database = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text="Source database of a finished move whose rows are not deleted yet."
+    )
+
+    def __str__(self):
+        return f"user {self.user_id} on {self.database}"
+
+    class Meta:
+        verbose_name = "user shard"
+        verbose_name_plural = "user shards"
+
+
+class UserProfile(models.Model):
+    """
+    Per-user preferences, stored on the default database next to the users.
+
+    `time_zone` is the default zone of the user's new events.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="event_profile",
+        help_text="Owner of the preferences."
+    )
+    time_zone = models.CharField(
+        max_length=64,
+        default=UTC_NAME,
+        validators=[validate_time_zone],
+        help_text="IANA time zone new events repeat in, e.g. 'America/New_York'."
+    )
+
+    def __str__(self):
+        return f"user {self.user_id} ({self.time_zone})"
+
+    class Meta:
+        verbose_name = "user profile"
+        verbose_name_plural = "user profiles"
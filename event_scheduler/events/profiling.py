@@ -0,0 +1,146 @@
+"""
+Sampling profiler for slow requests.
+
+A single background thread periodically captures the Python stack of every
+thread that is currently serving a profiled request. Samples are aggregated in
+memory as collapsed stacks (`outer;inner;leaf count`, the format read by
+flamegraph.pl, speedscope and similar tools) and written to disk only when the
+request turns out to be slow or was picked at random, so fast requests pay for
+nothing but the sampling itself.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Deepest stack recorded; deeper frames (outermost first) are dropped
+MAX_STACK_DEPTH = 200
+
+# Extension of written profiles; the first line is a `# {json tags}` comment
+PROFILE_SUFFIX = '.folded'
+
+# Tags recorded by views under this request attribute
+TAGS_ATTRIBUTE = 'profile_tags'
+
+
+def tag(request, **tags):
+    """
+    Attach tags (e.g. window size, expansion count) to the profile of `request`.
+
+    Does nothing unless the request is being profiled. Accepts DRF and Django
+    requests.
+    """
+    tags_dict = getattr(getattr(request, '_request', request), TAGS_ATTRIBUTE, None)
+    if tags_dict is not None:
+        tags_dict.update(tags)
+
+
+class StackSampler:
+    """
+    Background thread sampling the stacks of registered threads at a fixed interval.
+
+    The thread starts on the first registration and sleeps while nothing is
+    registered.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._labels = {}
+        self._prefixes = sorted({os.path.join(path, '') for path in sys.path if path}, key=len, reverse=True)
+
+    def start(self, thread_id):
+        """Start collecting samples for `thread_id`; returns the Counter they go to."""
+        samples = Counter()
+        with self._lock:
+            self._active[thread_id] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return samples
+
+    def stop(self, thread_id):
+        """
+        Stop collecting samples for `thread_id`.
+
+        Waits for a sampling pass in progress, so its Counter is final (and
+        safe to write out) once this returns.
+        """
+        with self._lock:
+            self._active.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            # A whole pass runs under the lock, so stop() never returns mid-pass
+            with self._lock:
+                if not self._active:
+                    self._wakeup.clear()
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[self._collapse(frame)] += 1
+                del frames
+            time.sleep(self.interval)
+
+    def _collapse(self, frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            for prefix in self._prefixes:
+                if path.startswith(prefix):
+                    path = path[len(prefix):]
+                    break
+            label = f'{code.co_name} ({path}:{code.co_firstlineno})'.replace(';', ',')
+            self._labels[code] = label
+        return label
+
+
+def write_profile(directory, name, samples, tags, max_files):
+    """
+    Write one collapsed-stack profile and drop the oldest files beyond `max_files`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name + PROFILE_SUFFIX)
+    with open(path, 'w') as handle:
+        handle.write(f'# {json.dumps(tags, default=str)}\n')
+        for stack, count in samples.most_common():
+            handle.write(f'{stack} {count}\n')
+
+    profiles = sorted(entry for entry in os.listdir(directory) if entry.endswith(PROFILE_SUFFIX))
+    for entry in profiles[:max(len(profiles) - max_files, 0)]:
+        try:
+            os.remove(os.path.join(directory, entry))
+        except FileNotFoundError:  # removed by another worker
+            pass
+    return path
+
+
+def read_profile(path):
+    """Return the (tags, {stack: count}) of a profile written by `write_profile`."""
+    tags = {}
+    samples = Counter()
+    with open(path) as handle:
+        for line in handle:
+            line = line.rstrip('\n')
+            if line.startswith('# '):
+                tags = json.loads(line[2:])
+            elif line:
+                stack, _, count = line.rpartition(' ')
+                samples[stack] += int(count)
+    return tags, samples
@@ -0,0 +1,247 @@
+"""
+Recurrence expansion for events.
+
+Recurrence rules are shared between events, so expansion works on the date
+sequence of a (rule shape, phase) pair rather than on each event separately.
+The phase captures everything the start date contributes to the sequence (e.g.
+the week parity of a bi-weekly rule, or the day of month of a monthly one).
+Every event with the same shape and phase produces the same dates, so a window
+is computed once and each event only shifts it by its own start time and
+duration. The dates follow dateutil's rrule semantics (weeks start on Monday,
+non-existent dates such as February 30 are skipped, `end_date` is inclusive).
+
+Series repeat in the wall time of their event's `time_zone`: dates are local
+dates, and each occurrence's local start is converted to UTC through the
+cached transition tables in `timezones`.
+"""
+from bisect import bisect_left
+from calendar import monthrange
+from datetime import MAXYEAR, date
+from functools import lru_cache
+
+from .models import Event
+from .timezones import local_date, utc_to_wall, wall_to_utc
+
+# Columns an occurrence sets itself instead of copying them from its series
+OCCURRENCE_FIELDS = ('id', 'start_time', 'end_time', 'is_recurring', 'recurrence_rule_id')
+
+# Longest window one request may expand; `window_dates` caches per window
+MAX_WINDOW_DAYS = 366
+
+WEEKDAY_INDEX = {'MON': 0, 'TUE': 1, 'WED': 2, 'THU': 3, 'FRI': 4, 'SAT': 5, 'SUN': 6}
+
+
+def series_key(rule, start_date):
+    """
+    Return the (shape, phase) pair that determines the dates of a series.
+
+    Two series with the same key produce the same dates, apart from each series
+    skipping the dates before its own start.
+    """
+    interval = rule.interval
+    if rule.frequency == 'DAILY':
+        phase = (start_date.toordinal() % interval,)
+    elif rule.frequency == 'WEEKLY':
+        if rule.weekdays:
+            days = tuple(sorted(WEEKDAY_INDEX[day] for day in rule.weekdays))
+        else:
+            days = (start_date.weekday(),)
+        # date.fromordinal(1) is a Monday, so this counts Monday-based weeks
+        phase = (((start_date.toordinal() - 1) // 7) % interval, days)
+    elif rule.frequency == 'MONTHLY':
+        month = start_date.year * 12 + start_date.month - 1
+        if rule.weekday and rule.ordinal:
+            by = (WEEKDAY_INDEX[rule.weekday], rule.ordinal)
+        else:
+            by = start_date.day
+        phase = (month % interval, by)
+    else:
+        phase = (start_date.year % interval, start_date.month, start_date.day)
+    return (rule.frequency, interval, rule.end_date), phase
+
+
+def iter_series_dates(shape, phase, from_date):
+    """
+    Lazily yield the dates of a series on or after `from_date`, in order.
+
+    Starts directly at the first period in phase, so the cost does not depend on
+    how long ago the series started.
+    """
+    frequency, interval, end_date = shape
+
+    if frequency == 'DAILY':
+        ordinal = from_date.toordinal()
+        ordinal += (phase[0] - ordinal) % interval
+        while True:
+            if ordinal > date.max.toordinal():
+                return
+            yield date.fromordinal(ordinal)
+            ordinal += interval
+
+    elif frequency == 'WEEKLY':
+        week_phase, days = phase
+        week = (from_date.toordinal() - 1) // 7
+        week += (week_phase - week) % interval
+        while True:
+            monday = week * 7 + 1
+            for day in days:
+                if monday + day > date.max.toordinal():
+                    return
+                current = date.fromordinal(monday + day)
+                if current >= from_date:
+                    yield current
+            week += interval
+
+    elif frequency == 'MONTHLY':
+        month_phase, by = phase
+        month = from_date.year * 12 + from_date.month - 1
+        month += (month_phase - month) % interval
+        while True:
+            year, month_index = divmod(month, 12)
+            if year > MAXYEAR:
+                return
+            days_in_month = monthrange(year, month_index + 1)[1]
+            if isinstance(by, tuple):
+                weekday, ordinal = by
+                first_weekday = date(year, month_index + 1, 1).weekday()
+                day = 1 + (weekday - first_weekday) % 7 + 7 * (ordinal - 1)
+            else:
+                day = by
+            if day <= days_in_month:
+                current = date(year, month_index + 1, day)
+                if current >= from_date:
+                    yield current
+            month += interval
+
+    else:
+        year_phase, month_of_year, day = phase
+        year = from_date.year
+        year += (year_phase - year) % interval
+        while year <= MAXYEAR:
+            if day <= monthrange(year, month_of_year)[1]:
+                current = date(year, month_of_year, day)
+                if current >= from_date:
+                    yield current
+            year += interval
+
+
+def series_dates(shape, phase, from_date):
+    """Dates of a series on or after `from_date`, stopping at the rule's end date."""
+    end_date = shape[2]
+    for current in iter_series_dates(shape, phase, from_date):
+        if end_date and current > end_date:
+            return
+        yield current
+
+
+@lru_cache(maxsize=4096)
+def window_dates(shape, phase, start_date, end_date):
+    """
+    Dates of a series within [start_date, end_date], computed once per shape and phase.
+
+    Rules are immutable once interned, so the cached result never goes stale.
+    """
+    dates = []
+    for current in series_dates(shape, phase, start_date):
+        if current > end_date:
+            break
+        dates.append(current)
+    return tuple(dates)
+
+
+def occurrence_factory(event):
+    """
+    Return a function creating unsaved occurrence instances of `event`.
+
+    Only columns that were loaded for `event` are copied, so deferred fields of
+    a sparse fieldset are never fetched row by row.
+    """
+    deferred = event.get_deferred_fields()
+    copied = {
+        field.attname: getattr(event, field.attname)
+        for field in Event._meta.concrete_fields
+        if field.attname not in deferred and field.attname not in OCCURRENCE_FIELDS
+    }
+    duration = event.end_time - event.start_time
+    zone = event.time_zone
+    # Occurrence times have whole-second precision, as with rrule
+    clock = utc_to_wall(zone, event.start_time).replace(microsecond=0).time()
+
+    def make(day):
+        start = wall_to_utc(zone, day, clock)
+        return Event(
+            start_time=start,
+            end_time=start + duration,
+            is_recurring=False,  # Instances are not recurring
+            **copied
+        )
+    return make
+
+
+def representable(make, dates):
+    """`make(day)` for each of `dates`, stopping at the first occurrence that would end past year 9999."""
+    for day in dates:
+        try:
+            yield make(day)
+        except OverflowError:
+            return
+
+
+def expand_recurring_event(event, start_date, end_date):
+    """
+    Expand a recurring event into instances within the date range.
+    """
+    first_date = local_date(event)
+    dates = window_dates(*series_key(event.recurrence_rule, first_date), start_date, end_date)
+    return list(representable(occurrence_factory(event), dates[bisect_left(dates, first_date):]))
+
+
+def occurrence_times(event, start_date, end_date):
+    """
+    (start, end) datetimes of a recurring event's occurrences within the date range.
+
+    Same dates as `expand_recurring_event`, without building model instances,
+    for bulk consumers such as exports.
+    """
+    zone = event.time_zone
+    first_wall = utc_to_wall(zone, event.start_time)
+    first_date = first_wall.date()
+    dates = window_dates(*series_key(event.recurrence_rule, first_date), start_date, end_date)
+    duration = event.end_time - event.start_time
+    clock = first_wall.replace(microsecond=0).time()
+
+    def make(day):
+        start = wall_to_utc(zone, day, clock)
+        return start, start + duration
+    return representable(make, dates[bisect_left(dates, first_date):])
+
+
+def expand_window(events, start_date, end_date):
+    """
+    Single events starting within [start_date, end_date] plus the occurrences of
+    recurring ones, sorted by start time. Dates are local to each event's zone.
+    """
+    expanded = []
+    for event in events:
+        if event.is_recurring and event.recurrence_rule:
+            expanded.extend(expand_recurring_event(event, start_date, end_date))
+        elif start_date <= local_date(event) <= end_date:
+            expanded.append(event)
+    expanded.sort(key=lambda x: x.start_time)
+    return expanded
+
+
+def iter_occurrences(event, after):
+    """
+    Lazily yield occurrence instances of a recurring event starting at or after `after`.
+
+    Nothing is computed until the iterator is advanced, so callers that stop
+    early (e.g. "next N events") never expand the rest of the series.
+    """
+    first_date = local_date(event)
+    after_date = utc_to_wall(event.time_zone, after).date()
+    make = occurrence_factory(event)
+    dates = series_dates(*series_key(event.recurrence_rule, first_date), max(first_date, after_date))
+    for occurrence in representable(make, dates):
+        if occurrence.start_time >= after:
+            yield occurrence
@@ -0,0 +1,146 @@
+"""
+Read-replica routing for the read-heavy calendar endpoints.
+
+`settings.DATABASE_REPLICAS` maps a primary alias (`default` or a shard) to the
+aliases of its replicas. Views opt in by running their safe handlers inside
+`replica_reads()` (see `ReplicaReadMixin` in the views); everything else, and
+every write, keeps using the primaries.
+
+A replica is only used while it is reachable and no more than
+`REPLICA_MAX_LAG_SECONDS` behind its primary. Each process checks a replica at
+most every `REPLICA_CHECK_INTERVAL` seconds and falls back to the primary in
+between when the last check failed.
+
+After a user writes, their reads stay on the primaries for
+`REPLICA_STICKY_SECONDS` (read-your-writes), so keep that above the tolerated
+lag. The sticky marks live in the Django cache; configure a shared cache when
+running several workers.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Replica chosen per primary alias for the current request, or None outside replica_reads()
+_chosen = ContextVar('replica_reads', default=None)
+
+_lock = threading.Lock()
+# replica alias -> (checked at, usable)
+_health = {}
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def get_replicas(alias):
+    """Replica aliases of a primary database."""
+    return list(getattr(settings, 'DATABASE_REPLICAS', {}).get(alias, ()))
+
+
+def primary_for(alias):
+    """The primary a replica alias belongs to (primaries map to themselves)."""
+    for primary, replicas in getattr(settings, 'DATABASE_REPLICAS', {}).items():
+        if alias in replicas:
+            return primary
+    return alias
+
+
+def is_replica(alias):
+    return primary_for(alias) != alias
+
+
+def _sticky_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def mark_written(user_id):
+    """Keep a user's reads on the primaries for `REPLICA_STICKY_SECONDS`."""
+    cache.set(_sticky_key(user_id), True, getattr(settings, 'REPLICA_STICKY_SECONDS', 10))
+
+
+def recently_wrote(user_id):
+    return cache.get(_sticky_key(user_id), False)
+
+
+def replica_lag(alias):
+    """Seconds replica `alias` is behind its primary (0 for non-PostgreSQL stand-ins)."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRES_LAG_SQL)
+            return float(cursor.fetchone()[0])
+        cursor.execute('SELECT 1')
+        return 0.0
+
+
+def is_usable(alias):
+    """Whether replica `alias` is reachable and within the lag limit; checked at most every interval."""
+    now = time.monotonic()
+    with _lock:
+        checked_at, usable = _health.get(alias, (None, False))
+        if checked_at is not None and now - checked_at < getattr(settings, 'REPLICA_CHECK_INTERVAL', 5):
+            return usable
+        # Other threads keep the previous verdict while this one checks
+        _health[alias] = (now, usable)
+
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)
+    try:
+        lag = replica_lag(alias)
+        usable = lag <= max_lag
+        if not usable:
+            logger.warning("Replica %s is %.1fs behind; reading from %s", alias, lag, primary_for(alias))
+    except DatabaseError:
+        logger.warning("Replica %s is unavailable; reading from %s", alias, primary_for(alias), exc_info=True)
+        connections[alias].close()
+        usable = False
+    with _lock:
+        _health[alias] = (time.monotonic(), usable)
+    return usable
+
+
+def read_database(alias):
+    """
+    Database to read `alias`'s data from: a usable replica inside
+    `replica_reads()`, otherwise the primary.
+
+    The choice is kept for the rest of the request, so all of its reads see
+    the same replica.
+    """
+    chosen = _chosen.get()
+    if chosen is None:
+        return primary_for(alias)
+    alias = alias or DEFAULT_DB_ALIAS
+    if alias not in chosen:
+        usable = [replica for replica in get_replicas(alias) if is_usable(replica)]
+        chosen[alias] = random.choice(usable) if usable else alias
+    return chosen[alias]
+
+
+@contextmanager
+def replica_reads(user_id=None):
+    """
+    Read from replicas within the block, unless `user_id` wrote recently.
+
+    Only wrap code that does not write.
+    """
+    if not getattr(settings, 'DATABASE_REPLICAS', None) or (user_id is not None and recently_wrote(user_id)):
+        yield
+        return
+    token = _chosen.set({})
+    try:
+        yield
+    finally:
+        _chosen.reset(token)
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+
+from . import replicas
+from .sharding import SHARD_MAP_DATABASE, get_shards, shard_for_user
+
+SHARDED_MODELS = {'event', 'recurrencerule', 'archivedevent'}
+
+
+def is_sharded(model):
+    return model._meta.app_label == 'events' and model._meta.model_name in SHARDED_MODELS
+
+
+class UserShardRouter:
+    """
+    Routes user-scoped event data to the user's shard.
+
+    Views query through `for_user()`, which selects the shard explicitly; this
+    router covers saves and related lookups, using the database an instance was
+    loaded from or, for new rows and lookups from a user, the user's shard. Users and the shard map
+    stay on the default database.
+
+    Inside `replicas.replica_reads()` reads go to a replica of that database;
+    writes always go to the primary, even for instances read from a replica.
+    """
+
+    def _db_for_instance(self, model, hints):
+        instance = hints.get('instance')
+        if instance is None or not is_sharded(model):
+            return None
+        if isinstance(instance, User):
+            # Related lookups from a user, e.g. assigning `event.user` or `user.events`
+            return shard_for_user(instance)
+        if instance._state.db:
+            return instance._state.db
+        user_id = getattr(instance, 'user_id', None)
+        if user_id is not None:
+            return shard_for_user(user_id)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower == 'events.usershard':
+            return SHARD_MAP_DATABASE
+        return replicas.read_database(self._db_for_instance(model, hints))
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label_lower == 'events.usershard':
+            return SHARD_MAP_DATABASE
+        alias = self._db_for_instance(model, hints)
+        return replicas.primary_for(alias) if alias else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Events reference users across databases (without a database constraint)
+        if is_sharded(type(obj1)) or is_sharded(type(obj2)):
+            return True
+        if replicas.primary_for(obj1._state.db) == replicas.primary_for(obj2._state.db):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if replicas.is_replica(db):
+            return False
+        if app_label == 'events' and model_name == 'usershard':
+            return db == SHARD_MAP_DATABASE
+        if app_label == 'events' and model_name in SHARDED_MODELS:
+            return db in get_shards()
+        return None
@@ -1,9 +1,12 @@
 
 from rest_framework import serializers
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from dateutil.relativedelta import relativedelta
 from .models import Event, RecurrenceRule
+from .recurrence import MAX_WINDOW_DAYS
+from .sharding import shard_for_user
+from .timezones import user_time_zone, utc_to_wall, validate_time_zone
 from django.contrib.auth.models import User
 
 
@@ -97,15 +100,51 @@ class EventSerializer(serializers.ModelSerializer):
     """
     Serializes events, including location and recurrence.
 
-    Validates time, location, and recurrence constraints.
+    Validates time, location, and recurrence constraints. An optional `fields`
+    argument limits the output to a sparse fieldset. New events without a
+    `time_zone` take the owner's default zone.
     """
     recurrence_rule = RecurrenceRuleSerializer(required=False, allow_null=True)
 
     class Meta:
         model = Event
-        fields = ['id', 'title', 'description', 'location', 'start_time', 'end_time', 'is_recurring', 'recurrence_rule']
+        fields = [
+            'id', 'title', 'description', 'location', 'start_time', 'end_time', 'is_recurring', 'time_zone',
+            'recurrence_rule'
+        ]
         read_only_fields = ['id']
 
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def get_time_zone(self, data):
+        """Zone the validated event repeats in."""
+        if data.get('time_zone'):
+            return data['time_zone']
+        if self.instance is not None:
+            return self.instance.time_zone
+        return user_time_zone(self.context['request'].user)
+
+    def merge_recurrence_rule(self, recurrence_rule):
+        """
+        Complete a partially updated rule with the fields of the event's current rule.
+
+        The merged rule is validated as a whole, so a missing frequency or a
+        combination the rule serializer rejects is still a validation error.
+        """
+        current = self.instance.recurrence_rule if self.instance is not None else None
+        if current is not None:
+            fields = RecurrenceRuleSerializer.Meta.fields
+            recurrence_rule = {**{name: getattr(current, name) for name in fields}, **recurrence_rule}
+        rule_serializer = RecurrenceRuleSerializer(data=recurrence_rule)
+        if not rule_serializer.is_valid():
+            raise serializers.ValidationError({"recurrence_rule": rule_serializer.errors})
+        return rule_serializer.validated_data
+
     def validate(self, data):
         # Time validations
         if data['start_time'] < timezone.now():
@@ -116,6 +155,8 @@ class EventSerializer(serializers.ModelSerializer):
         # Recurrence validations
         is_recurring = data.get('is_recurring', False)
         recurrence_rule = data.get('recurrence_rule')
+        if recurrence_rule and self.partial:
+            recurrence_rule = data['recurrence_rule'] = self.merge_recurrence_rule(recurrence_rule)
 
         if is_recurring and not recurrence_rule:
             raise serializers.ValidationError({"recurrence_rule": "Required for recurring events."})
@@ -124,7 +165,8 @@ class EventSerializer(serializers.ModelSerializer):
 
         if is_recurring and recurrence_rule:
             end_date = recurrence_rule.get('end_date')
-            start_date = data['start_time'].date()
+            # Rule end dates are local to the event's zone
+            start_date = utc_to_wall(self.get_time_zone(data), data['start_time']).date()
             frequency = recurrence_rule.get('frequency')
             interval = recurrence_rule.get('interval', 1)
             weekdays = recurrence_rule.get('weekdays')
@@ -139,6 +181,9 @@ class EventSerializer(serializers.ModelSerializer):
 
             # Ensure duration supports at least one recurrence
             if end_date:
+                # Imported lazily to keep dateutil off the startup path
+                from dateutil.relativedelta import relativedelta
+
                 min_duration = None
                 error_msg = f"End date must allow at least one recurrence for {frequency} every {interval} {'period' if interval == 1 else 'periods'}."
                 if frequency == 'DAILY':
@@ -174,52 +219,149 @@ class EventSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         recurrence_rule_data = validated_data.pop('recurrence_rule', None)
-        event = Event.objects.create(**validated_data)
-        
-        if recurrence_rule_data:
+        if not validated_data.get('time_zone'):
+            validated_data['time_zone'] = user_time_zone(validated_data['user'])
+        event = Event(**validated_data)
+        if not recurrence_rule_data:
+            event.save(force_insert=True)
+            return event
+
+        # The interned rule stays locked until the event referencing it is saved
+        with transaction.atomic(using=shard_for_user(event.user_id)):
             self.create_or_update_recurrence_rule(event, recurrence_rule_data)
-            
+            # Single INSERT: the interned rule is attached before saving
+            event.save(force_insert=True)
         return event
 
     def update(self, instance, validated_data):
         recurrence_rule_data = validated_data.pop('recurrence_rule', None)
-        
+        previous_rule_id = instance.recurrence_rule_id
+
         # Update event fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        
-        # Handle recurrence rule
-        if recurrence_rule_data is not None:
-            self.create_or_update_recurrence_rule(instance, recurrence_rule_data)
-        elif instance.is_recurring:
-            # If is_recurring is True but no recurrence_rule provided, keep existing rule
-            pass
-        else:
-            # If not recurring, remove any existing rule
-            if instance.recurrence_rule:
-                instance.recurrence_rule.delete()
+
+        # The interned rule stays locked until the event referencing it is saved
+        with transaction.atomic(using=instance._state.db):
+            # Handle recurrence rule
+            if recurrence_rule_data is not None:
+                self.create_or_update_recurrence_rule(instance, recurrence_rule_data)
+            elif instance.is_recurring:
+                # If is_recurring is True but no recurrence_rule provided, keep existing rule
+                pass
+            else:
+                # If not recurring, detach any existing rule
                 instance.recurrence_rule = None
-        
-        instance.save()
+
+            instance.save()
+
+        # Rules are shared, so the old one is only removed once nothing uses it
+        if previous_rule_id and previous_rule_id != instance.recurrence_rule_id:
+            RecurrenceRule.objects.using(instance._state.db).filter(pk=previous_rule_id).delete_orphaned()
         return instance
 
     def create_or_update_recurrence_rule(self, event, recurrence_rule_data):
-        if event.recurrence_rule:
-            # Update existing rule
-            rule_serializer = RecurrenceRuleSerializer(
-                instance=event.recurrence_rule,
-                data=recurrence_rule_data
-            )
-        else:
-            # Create new rule
-            rule_serializer = RecurrenceRuleSerializer(
-                data=recurrence_rule_data
+        """
+        Attach the interned rule matching `recurrence_rule_data` to `event` (unsaved).
+
+        Shared rules are never modified in place; changing a rule points the
+        event at another (possibly existing) interned rule instead. The rule is
+        interned on the shard holding the event.
+        """
+        db = event._state.db or shard_for_user(event.user_id)
+        event.recurrence_rule = RecurrenceRule.objects.using(db).intern(**recurrence_rule_data)
+
+
+
+class EventBulkDeleteSerializer(serializers.Serializer):
+    """
+    Validates the selection for a bulk delete.
+
+    Events can be selected by id list, by start date range, or by creation time
+    (e.g. everything created by one calendar import). Criteria are combined.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=10000
+    )
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError(
+                "Provide ids, a start_date/end_date range or a created_after/created_before range."
             )
-        
-        rule_serializer.is_valid(raise_exception=True)
-        recurrence_rule = rule_serializer.save()
-        event.recurrence_rule = recurrence_rule
-        event.save()
+        if bool(data.get('start_date')) != bool(data.get('end_date')):
+            raise serializers.ValidationError({
+                "end_date": "Both start_date and end_date must be provided together."
+            })
+        if data.get('start_date') and data['end_date'] < data['start_date']:
+            raise serializers.ValidationError({"end_date": "End date cannot be before start date."})
+        if data.get('created_after') and data.get('created_before') and data['created_before'] <= data['created_after']:
+            raise serializers.ValidationError({"created_before": "Must be after created_after."})
+        return data
+
+
+class UserTimeZoneSerializer(serializers.Serializer):
+    """
+    Validates a change of the user's default time zone (an IANA name).
+    """
+    time_zone = serializers.CharField(max_length=64, validators=[validate_time_zone])
+
+
+class SeriesTruncateSerializer(serializers.Serializer):
+    """
+    Validates a series truncation: occurrences on or after `from_date` are dropped.
+    """
+    from_date = serializers.DateField()
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """
+    Validates one sub-request of a batch.
+
+    `events` lists a calendar window (like `GET /api/events/?start_date=...`),
+    `event` fetches one event by `pk`, and `current_user` returns the user.
+    """
+    TYPE_CHOICES = ['events', 'event', 'current_user']
+
+    id = serializers.CharField(required=False, max_length=100)
+    type = serializers.ChoiceField(choices=TYPE_CHOICES)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    fields = serializers.CharField(required=False)
+    include_archived = serializers.BooleanField(default=False)
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    pk = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, data):
+        if data['type'] == 'events':
+            if not data.get('start_date') or not data.get('end_date'):
+                raise serializers.ValidationError({"end_date": "Both start_date and end_date are required."})
+            if data['end_date'] < data['start_date']:
+                raise serializers.ValidationError({"end_date": "End date cannot be before start date."})
+            if (data['end_date'] - data['start_date']).days >= MAX_WINDOW_DAYS:
+                raise serializers.ValidationError({"end_date": f"Windows are limited to {MAX_WINDOW_DAYS} days."})
+        if data['type'] == 'event' and not data.get('pk'):
+            raise serializers.ValidationError({"pk": "Required for event sub-requests."})
+        return data
+
+
+class BatchSerializer(serializers.Serializer):
+    """
+    Validates the envelope of a batch: a list of sub-requests, validated one by one.
+    """
+    requests = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=20
+    )
 
 
 
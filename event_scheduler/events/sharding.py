@@ -0,0 +1,237 @@
+"""
+User-sharded storage for events.
+
+Every user's `Event`, `RecurrenceRule` and `ArchivedEvent` rows live on one of
+the databases listed in `settings.EVENT_SHARDS`. The placement is recorded in
+the `UserShard` map on the default database: new users are placed by user id,
+and `rebalance_shards` moves users afterwards. With a single shard (the default
+setup) everything stays on `default` and no map rows are written.
+
+Placements are cached per process, so reads may use a stale placement for up
+to SHARD_CACHE_TIMEOUT after a move (use a shared cache to avoid that). Writes
+never do: write views call `check_placement()`, which reads the map itself and
+refuses writes while the user is being moved.
+
+Event ids are only unique per database, so give each shard a disjoint id range
+(`rebalance_shards --reserve-id-ranges` does this on PostgreSQL) before moving
+users between shards.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+# Database holding the shard map (and the users)
+SHARD_MAP_DATABASE = 'default'
+
+# How long a placement is cached; other processes see a move after at most this long
+SHARD_CACHE_TIMEOUT = 300
+
+# How long a move waits after refusing writes, for writes already past the check
+SHARD_MOVE_GRACE_SECONDS = 5
+
+# Ids reserved per shard by `rebalance_shards --reserve-id-ranges`
+SHARD_ID_RANGE = 10 ** 12
+
+
+def get_shards():
+    """Database aliases holding user data, in placement order."""
+    return list(getattr(settings, 'EVENT_SHARDS', None) or [SHARD_MAP_DATABASE])
+
+
+def default_placement(user_id):
+    """Shard a new user is placed on."""
+    shards = get_shards()
+    return shards[user_id % len(shards)]
+
+
+def _cache_key(user_id):
+    return f'event-shard:{user_id}'
+
+
+def shard_for_user(user):
+    """
+    Database alias holding the data of `user` (a user instance or id).
+
+    Placements are cached; the map row is created on first use so a user keeps
+    their shard when shards are added later.
+    """
+    from .models import UserShard
+
+    user_id = getattr(user, 'pk', user)
+    shards = get_shards()
+    if len(shards) == 1:
+        return shards[0]
+
+    alias = cache.get(_cache_key(user_id))
+    if alias is None:
+        placement, _ = UserShard.objects.using(SHARD_MAP_DATABASE).get_or_create(
+            user_id=user_id,
+            defaults={'database': default_placement(user_id)}
+        )
+        alias = placement.database
+        cache.set(_cache_key(user_id), alias, SHARD_CACHE_TIMEOUT)
+    return alias
+
+
+class UserMoveInProgress(Exception):
+    """The user's data is being moved to another shard; writes must wait."""
+
+
+def check_placement(user):
+    """
+    Database alias holding the data of `user`, read from the shard map itself.
+
+    Called before writes, so a placement cached before a move is never written
+    to. Refreshes the cached placement, and raises UserMoveInProgress while the
+    user is being moved.
+    """
+    from .models import UserShard
+
+    user_id = getattr(user, 'pk', user)
+    if len(get_shards()) == 1:
+        return get_shards()[0]
+
+    placement, _ = UserShard.objects.using(SHARD_MAP_DATABASE).get_or_create(
+        user_id=user_id,
+        defaults={'database': default_placement(user_id)}
+    )
+    if placement.moving_to:
+        raise UserMoveInProgress(f"User {user_id} is being moved to {placement.moving_to}.")
+    cache.set(_cache_key(user_id), placement.database, SHARD_CACHE_TIMEOUT)
+    return placement.database
+
+
+def move_user(user_id, target):
+    """
+    Move all event data of a user to the `target` shard.
+
+    The move is recorded in the shard map first, which makes `check_placement()`
+    refuse the user's writes, and then waits SHARD_MOVE_GRACE_SECONDS for writes
+    already under way. The rules (interned again on the target), events and
+    archived events are copied with their ids, the map is switched, and the
+    source rows are deleted. Every step can be repeated, so an interrupted move
+    is finished by calling this again with the same target. Returns the number
+    of moved events.
+    """
+    from .models import UserShard
+
+    placement, _ = UserShard.objects.using(SHARD_MAP_DATABASE).get_or_create(
+        user_id=user_id,
+        defaults={'database': default_placement(user_id)}
+    )
+    if placement.previous_database:
+        # An earlier move switched but did not delete its source rows
+        finish_move(user_id, placement.previous_database)
+    if placement.moving_to and placement.moving_to != target:
+        raise ValueError(f"User {user_id} is being moved to {placement.moving_to}; finish that move first.")
+    source = placement.database
+    if source == target:
+        return 0
+
+    UserShard.objects.using(SHARD_MAP_DATABASE).filter(user_id=user_id).update(moving_to=target)
+    cache.delete(_cache_key(user_id))
+    time.sleep(getattr(settings, 'SHARD_MOVE_GRACE_SECONDS', SHARD_MOVE_GRACE_SECONDS))
+
+    moved = copy_user_rows(user_id, source, target)
+
+    UserShard.objects.using(SHARD_MAP_DATABASE).filter(user_id=user_id).update(
+        database=target, moving_to=None, previous_database=source
+    )
+    cache.set(_cache_key(user_id), target, SHARD_CACHE_TIMEOUT)
+    finish_move(user_id, source)
+    return moved
+
+
+def copy_user_rows(user_id, source, target):
+    """
+    Copy a user's rules, events and archived events from `source` to `target`.
+
+    Rows left on the target by an interrupted copy are cleared first, so copying
+    again gives the same result. Returns the number of copied events.
+    """
+    from .models import ArchivedEvent, Event, RecurrenceRule
+
+    events = list(Event.objects.using(source).filter(user_id=user_id).values())
+    archived = list(ArchivedEvent.objects.using(source).filter(user_id=user_id).values())
+    rule_ids = {row['recurrence_rule_id'] for row in events + archived if row['recurrence_rule_id']}
+    rules = RecurrenceRule.objects.using(source).filter(pk__in=rule_ids)
+
+    with transaction.atomic(using=target):
+        delete_user_rows(target, user_id)
+
+        ids = [row['id'] for row in events]
+        archived_ids = [row['id'] for row in archived]
+        if (Event.objects.using(target).filter(pk__in=ids).exists() or
+                ArchivedEvent.objects.using(target).filter(pk__in=archived_ids).exists()):
+            raise ValueError(
+                f"Event ids of user {user_id} already exist on {target}; reserve disjoint id ranges per shard first."
+            )
+
+        rule_map = {
+            rule.pk: RecurrenceRule.objects.using(target).intern(
+                frequency=rule.frequency,
+                interval=rule.interval,
+                end_date=rule.end_date,
+                weekdays=rule.weekdays,
+                weekday=rule.weekday,
+                ordinal=rule.ordinal
+            ).pk
+            for rule in rules
+        }
+        for row in events + archived:
+            row['recurrence_rule_id'] = rule_map.get(row['recurrence_rule_id'])
+        Event.objects.using(target).bulk_create([Event(**row) for row in events])
+        ArchivedEvent.objects.using(target).bulk_create([ArchivedEvent(**row) for row in archived])
+    return len(events)
+
+
+def finish_move(user_id, source):
+    """Delete a moved user's rows from the shard they left, then forget it."""
+    from .models import UserShard
+
+    delete_user_rows(source, user_id)
+    UserShard.objects.using(SHARD_MAP_DATABASE).filter(user_id=user_id, previous_database=source).update(
+        previous_database=None
+    )
+
+
+def delete_user_rows(alias, user_id):
+    """Delete a user's events, archived events and now unused rules on one database."""
+    from .models import ArchivedEvent, Event, RecurrenceRule
+
+    archived = ArchivedEvent.objects.using(alias).filter(user_id=user_id)
+    with transaction.atomic(using=alias):
+        rule_ids = list(
+            archived.filter(recurrence_rule__isnull=False).order_by().values_list('recurrence_rule_id', flat=True).distinct()
+        )
+        archived.delete()
+        Event.objects.using(alias).filter(user_id=user_id).delete_with_rules()
+        if rule_ids:
+            RecurrenceRule.objects.using(alias).filter(pk__in=rule_ids).delete_orphaned()
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_user_data(sender, instance, using, **kwargs):
+    """
+    Remove a deleted user's data from their shard.
+
+    The ORM cascade only reaches rows on the user's own database, so rows on
+    other shards are deleted here.
+    """
+    from .models import UserShard
+
+    if len(get_shards()) == 1:
+        return
+    aliases = {shard_for_user(instance)}
+    placement = UserShard.objects.using(SHARD_MAP_DATABASE).filter(user_id=instance.pk).first()
+    if placement is not None:
+        # Rows of an unfinished move, on either side
+        aliases.update(alias for alias in (placement.moving_to, placement.previous_database) if alias)
+    for alias in aliases - {using}:
+        delete_user_rows(alias, instance.pk)
+    cache.delete(_cache_key(instance.pk))
@@ -0,0 +1,173 @@
+"""
+Compact binary columnar snapshots of a calendar window.
+
+An alternative to the JSON listing for mobile and offline clients, negotiated
+with `Accept: application/vnd.event-scheduler.snapshot` (or `?format=snapshot`).
+A snapshot holds every occurrence of a window, sorted by start, as columns:
+
+    header       magic b'EVSN', uint16 version, uint16 reserved, uint32 rows,
+                 uint32 strings, uint32 window start and end (date ordinals)
+    starts       int64[rows]   epoch seconds (UTC)
+    ends         int64[rows]   epoch seconds (UTC)
+    series       int64[rows]   id of the event (of the series, for occurrences)
+    titles       uint32[rows]  index into the string table
+    locations    uint32[rows]  index into the string table, NO_STRING if null
+    kinds        uint8[rows]   SINGLE or OCCURRENCE
+    (padding to a multiple of 4 bytes)
+    offsets      uint32[strings + 1]  byte offsets into the string data
+    string data  UTF-8, titles and locations deduplicated
+
+All integers are little-endian and the int64 columns are 8-byte aligned, so
+clients can map the columns straight into typed arrays. Columns are filled
+from `array` buffers without building model instances or dicts per row.
+"""
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from datetime import date, datetime, timezone
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .recurrence import occurrence_times
+from .timezones import local_date
+
+MEDIA_TYPE = 'application/vnd.event-scheduler.snapshot'
+MAGIC = b'EVSN'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')
+
+NO_STRING = 0xFFFFFFFF
+SINGLE = 0
+OCCURRENCE = 1
+
+# Event columns the encoder reads
+SNAPSHOT_FIELDS = ('title', 'location', 'start_time', 'end_time', 'is_recurring', 'time_zone', 'recurrence_rule')
+
+assert array('q').itemsize == 8 and array('I').itemsize == 4, "unsupported platform integer sizes"
+
+
+def _little_endian(column):
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _padding(size, alignment):
+    return b'\0' * (-size % alignment)
+
+
+def encode_window(events, start_date, end_date):
+    """
+    Encode the occurrences of `events` within [start_date, end_date] as a snapshot.
+
+    Selects and expands like `expand_window`: single events starting in the
+    range plus the occurrences of recurring ones.
+    """
+    starts, ends, series = array('q'), array('q'), array('q')
+    titles, locations, kinds = array('I'), array('I'), array('B')
+    strings = {}
+
+    for event in events:
+        if event.is_recurring and event.recurrence_rule:
+            times, kind = occurrence_times(event, start_date, end_date), OCCURRENCE
+        elif start_date <= local_date(event) <= end_date:
+            times, kind = ((event.start_time, event.end_time),), SINGLE
+        else:
+            continue
+        title = strings.setdefault(event.title, len(strings))
+        location = NO_STRING if event.location is None else strings.setdefault(event.location, len(strings))
+        rows = len(starts)
+        for start, end in times:
+            starts.append(int(start.timestamp()))
+            ends.append(int(end.timestamp()))
+        added = len(starts) - rows
+        series.extend([event.pk] * added)
+        titles.extend([title] * added)
+        locations.extend([location] * added)
+        kinds.extend([kind] * added)
+
+    order = sorted(range(len(starts)), key=starts.__getitem__)
+    columns = [array(column.typecode, map(column.__getitem__, order))
+               for column in (starts, ends, series, titles, locations, kinds)]
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = array('I', [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    body = b''.join(_little_endian(column) for column in columns)
+    parts = [
+        HEADER.pack(MAGIC, VERSION, 0, len(order), len(strings), start_date.toordinal(), end_date.toordinal()),
+        body,
+        _padding(len(body), 4),
+        _little_endian(offsets),
+        *encoded,
+    ]
+    return b''.join(parts)
+
+
+class Snapshot(namedtuple('Snapshot', [
+        'start_date', 'end_date', 'starts', 'ends', 'series', 'titles', 'locations', 'kinds', 'strings'])):
+    """Decoded snapshot: typed column arrays and the string table."""
+
+    def rows(self):
+        """Yield one dict per occurrence (for debugging and tests; clients read the columns)."""
+        utc = timezone.utc
+        for index in range(len(self.starts)):
+            location = self.locations[index]
+            yield {
+                'series': self.series[index],
+                'title': self.strings[self.titles[index]],
+                'location': None if location == NO_STRING else self.strings[location],
+                'start_time': datetime.fromtimestamp(self.starts[index], utc),
+                'end_time': datetime.fromtimestamp(self.ends[index], utc),
+                'occurrence': self.kinds[index] == OCCURRENCE,
+            }
+
+
+def decode(data):
+    """Decode a snapshot produced by `encode_window`."""
+    data = memoryview(data)
+    magic, version, _, rows, count, start_ordinal, end_ordinal = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} calendar snapshot.")
+
+    position = HEADER.size
+    columns = []
+    for typecode, size in (('q', 8), ('q', 8), ('q', 8), ('I', 4), ('I', 4), ('B', 1)):
+        column = array(typecode)
+        column.frombytes(data[position:position + rows * size])
+        columns.append(column)
+        position += rows * size
+    position += -position % 4
+
+    offsets = array('I')
+    offsets.frombytes(data[position:position + (count + 1) * 4])
+    if sys.byteorder == 'big':
+        for column in (*columns, offsets):
+            column.byteswap()
+    position += (count + 1) * 4
+    blob = bytes(data[position:position + offsets[-1]])
+    strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+
+    return Snapshot(date.fromordinal(start_ordinal), date.fromordinal(end_ordinal), *columns, strings)
+
+
+class SnapshotRenderer(BaseRenderer):
+    """
+    Pass encoded snapshots through; anything else (errors) is rendered as JSON.
+    """
+    media_type = MEDIA_TYPE
+    format = 'snapshot'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return JSONRenderer().render(data)
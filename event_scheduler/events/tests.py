@@ -1,3 +1,1319 @@
-from django.test import TestCase
+"""
+Query-budget regression tests for the API.
 
-# Create your tests here.
+Every endpoint is called against realistic seeded data and must stay within a
+maximum number of SQL queries and a maximum number of rows fetched, declared
+per view in QUERY_BUDGETS. A budget failure prints every query with the rows it
+fetched, so N+1 patterns and over-fetching are visible right away.
+
+The replica routing tests need replica aliases and are skipped otherwise.
+
+Run without PostgreSQL:
+    python manage.py test events --settings=event_scheduler.settings_memory
+    python manage.py test events --settings=event_scheduler.settings_memory_replicas
+"""
+import csv
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from io import StringIO
+from itertools import islice
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
+
+from dateutil import rrule
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, OperationalError, connections
+from django.db.backends.utils import CursorWrapper
+from django.db.models import QuerySet
+from django.contrib.admin import site
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import replicas, sharding, warmup
+from .admin import EstimatedCountPaginator
+from .middleware import brotli, compress_brotli
+from .models import ArchivedEvent, Event, RecurrenceRule, UserShard, rule_signature
+from .profiling import StackSampler, read_profile, write_profile
+from .recurrence import (
+    MAX_WINDOW_DAYS, WEEKDAY_INDEX, expand_window, series_dates, series_key, window_dates
+)
+from .sharding import get_shards, move_user, shard_for_user
+from .serializers import EventSerializer
+from .snapshot import MEDIA_TYPE, decode
+from .timezones import set_user_time_zone, utc_to_wall, wall_to_utc
+from .views import UpcomingEventsView
+
+Budget = namedtuple('Budget', ['queries', 'rows'])
+
+# Writes read the shard map uncached (one query, one row) when there are several shards
+PLACEMENT_CHECK = 1 if len(get_shards()) > 1 else 0
+
+# Maximum queries and fetched rows per (view, case). Authentication is one
+# query and one row on every authenticated endpoint, and an INSERT returning
+# its primary key counts as one row. Lower a budget when a change makes an
+# endpoint cheaper; raising one needs a reason in the commit message.
+QUERY_BUDGETS = {
+    'event-list-create': {
+        'list': Budget(queries=3, rows=12),
+        'list_window': Budget(queries=2, rows=27),
+        'list_window_sparse': Budget(queries=2, rows=27),
+        'list_snapshot': Budget(queries=2, rows=41),
+        'create': Budget(queries=2 + PLACEMENT_CHECK, rows=2 + PLACEMENT_CHECK),
+        'create_recurring': Budget(queries=3 + PLACEMENT_CHECK, rows=3 + PLACEMENT_CHECK),
+    },
+    'event-upcoming': {
+        'upcoming': Budget(queries=3, rows=31),
+    },
+    'event-retrieve-update': {
+        'retrieve': Budget(queries=2, rows=2),
+        'update': Budget(queries=3 + PLACEMENT_CHECK, rows=2 + PLACEMENT_CHECK),
+        'update_rule': Budget(queries=6 + PLACEMENT_CHECK, rows=3 + PLACEMENT_CHECK),
+    },
+    'event-delete': {
+        'delete': Budget(queries=4 + PLACEMENT_CHECK, rows=2 + PLACEMENT_CHECK),
+    },
+    'event-bulk-delete': {
+        'bulk_delete': Budget(queries=5 + PLACEMENT_CHECK, rows=9 + PLACEMENT_CHECK),
+    },
+    'event-series-truncate': {
+        'truncate': Budget(queries=6 + PLACEMENT_CHECK, rows=3 + PLACEMENT_CHECK),
+    },
+    'batch': {
+        'batch': Budget(queries=3, rows=41),
+    },
+    'register': {
+        'register': Budget(queries=2, rows=1),
+    },
+    'current-user': {
+        'current_user': Budget(queries=1, rows=1),
+        'set_time_zone': Budget(queries=3, rows=2),
+    },
+}
+
+# Not counted against a budget
+TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+SINGLE_EVENTS = 30
+RECURRING_EVENTS = 10
+
+
+class QueryLog:
+    """
+    Record the SQL executed on every database and the rows each query fetched.
+
+    Rows are counted as the driver hands them over, so a query that fetches more
+    than the response needs is caught even if Django discards the surplus.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._record))
+        for name in ('fetchone', 'fetchmany', 'fetchall'):
+            self._stack.enter_context(mock.patch.object(CursorWrapper, name, self._counting(name), create=True))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def rows(self):
+        return sum(query['rows'] for query in self.queries)
+
+    def _record(self, execute, sql, params, many, context):
+        # Savepoints depend on how many atomic blocks the test itself is nested in
+        if sql.startswith(TRANSACTION_CONTROL):
+            return execute(sql, params, many, context)
+        entry = {'alias': context['connection'].alias, 'sql': sql, 'params': params, 'rows': 0}
+        self.queries.append(entry)
+        context['cursor']._query_log_entry = entry
+        return execute(sql, params, many, context)
+
+    def _counting(self, name):
+        def fetch(cursor, *args):
+            with cursor.db.wrap_database_errors:
+                result = getattr(cursor.cursor, name)(*args)
+            entry = getattr(cursor, '_query_log_entry', None)
+            if entry is not None:
+                if name == 'fetchone':
+                    entry['rows'] += result is not None
+                else:
+                    entry['rows'] += len(result)
+            return result
+        return fetch
+
+    def report(self):
+        lines = []
+        for index, query in enumerate(self.queries, 1):
+            lines.append(f"{index:>3}. [{query['alias']}, {query['rows']} row(s)] {query['sql']}")
+            if query['params']:
+                lines.append(f"     params: {query['params']}")
+        return '\n'.join(lines)
+
+
+@override_settings(EVENT_WARMUP_WORKERS=0, REPLICA_CHECK_INTERVAL=3600)
+class QueryBudgetTests(TestCase):
+    """
+    Every endpoint within its query and row budget.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        # Placements cached by other test classes would skip creating the map rows
+        cache.clear()
+        cls.user = User.objects.create_user('budget', 'budget@example.com', 'secret-password')
+        other = User.objects.create_user('other', 'other@example.com', 'secret-password')
+        cls.start = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+
+        for owner in (cls.user, other):
+            alias = shard_for_user(owner)
+            rules = [
+                RecurrenceRule.objects.using(alias).intern(frequency='DAILY', interval=2),
+                RecurrenceRule.objects.using(alias).intern(frequency='WEEKLY', interval=1, weekdays=['MON', 'WED']),
+                RecurrenceRule.objects.using(alias).intern(frequency='MONTHLY', interval=1, weekday='FRI', ordinal=2),
+                RecurrenceRule.objects.using(alias).intern(frequency='YEARLY', interval=1),
+            ]
+            events = []
+            for i in range(SINGLE_EVENTS):
+                start = cls.start + timedelta(days=i, hours=i % 8)
+                events.append(Event(
+                    user=owner, title=f'Meeting {i}', description='Weekly sync with the team.',
+                    location='Room 1', start_time=start, end_time=start + timedelta(hours=1)
+                ))
+            for i in range(RECURRING_EVENTS):
+                start = cls.start + timedelta(hours=i)
+                events.append(Event(
+                    user=owner, title=f'Series {i}', description='Recurring check-in.', location='Online',
+                    start_time=start, end_time=start + timedelta(minutes=30),
+                    is_recurring=True, recurrence_rule=rules[i % len(rules)]
+                ))
+            Event.objects.using(alias).bulk_create(events)
+        events = Event.objects.for_user(cls.user)
+        cls.single = events.filter(recurrence_rule__isnull=True).earliest('start_time')
+        cls.series = events.filter(recurrence_rule__frequency='DAILY').earliest('start_time')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        # Replica health checks are amortized over many requests; keep them out of the budgets
+        for alias in connections:
+            if replicas.is_replica(alias):
+                replicas.is_usable(alias)
+        # Default time zones are cached like shard placements
+        set_user_time_zone(self.user, 'UTC')
+
+    def window(self, days=30):
+        start_date = self.start.date()
+        return {'start_date': str(start_date), 'end_date': str(start_date + timedelta(days=days))}
+
+    def event_payload(self, **overrides):
+        start = self.start + timedelta(days=3)
+        payload = {
+            'title': 'Planning', 'description': 'Quarterly planning.', 'location': 'Room 2',
+            'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=1)).isoformat(),
+            'is_recurring': False, 'recurrence_rule': None,
+        }
+        payload.update(overrides)
+        return payload
+
+    def assertWithinBudget(self, view, case, method, url, data=None, expected_status=200):
+        budget = QUERY_BUDGETS[view][case]
+        with QueryLog() as log:
+            response = getattr(self.client, method)(url, data, format='json' if method != 'get' else None)
+        self.assertEqual(response.status_code, expected_status, response.content)
+        problems = []
+        if len(log.queries) > budget.queries:
+            problems.append(f"{len(log.queries)} queries (budget {budget.queries})")
+        if log.rows > budget.rows:
+            problems.append(f"{log.rows} rows fetched (budget {budget.rows})")
+        if problems:
+            self.fail(f"{view} [{case}] exceeded its budget: {', '.join(problems)}\n{log.report()}")
+        return response
+
+    def test_list(self):
+        response = self.assertWithinBudget('event-list-create', 'list', 'get', reverse('event-list-create'))
+        self.assertEqual(response.data['count'], SINGLE_EVENTS + RECURRING_EVENTS)
+
+    def test_list_window(self):
+        # The singles of days 15 to 29 are outside the window and not loaded
+        response = self.assertWithinBudget(
+            'event-list-create', 'list_window', 'get', reverse('event-list-create'),
+            {**self.window(days=14), 'page_size': 100}
+        )
+        self.assertGreater(response.data['count'], 15)
+
+    def test_list_window_sparse(self):
+        self.assertWithinBudget(
+            'event-list-create', 'list_window_sparse', 'get', reverse('event-list-create'),
+            {**self.window(days=14), 'fields': 'id,title,start_time,end_time'}
+        )
+
+    def test_list_snapshot(self):
+        window = self.window()
+        response = self.assertWithinBudget(
+            'event-list-create', 'list_snapshot', 'get', reverse('event-list-create'), {**window, 'format': 'snapshot'}
+        )
+        self.assertEqual(response['Content-Type'], MEDIA_TYPE)
+        listing = self.client.get(reverse('event-list-create'), window)
+        self.assertEqual(len(decode(response.content).starts), listing.data['count'])
+
+    def test_create(self):
+        self.assertWithinBudget(
+            'event-list-create', 'create', 'post', reverse('event-list-create'), self.event_payload(),
+            expected_status=201
+        )
+
+    def test_create_recurring(self):
+        # Reuses an interned rule: no rule INSERT, and a single event INSERT
+        self.assertWithinBudget(
+            'event-list-create', 'create_recurring', 'post', reverse('event-list-create'),
+            self.event_payload(is_recurring=True, recurrence_rule={'frequency': 'DAILY', 'interval': 2}),
+            expected_status=201
+        )
+
+    def test_upcoming(self):
+        self.assertWithinBudget('event-upcoming', 'upcoming', 'get', reverse('event-upcoming'), {'limit': 20})
+
+    def test_retrieve(self):
+        self.assertWithinBudget(
+            'event-retrieve-update', 'retrieve', 'get', reverse('event-retrieve-update', args=[self.series.pk])
+        )
+
+    def test_update(self):
+        self.assertWithinBudget(
+            'event-retrieve-update', 'update', 'put', reverse('event-retrieve-update', args=[self.single.pk]),
+            self.event_payload(title='Renamed')
+        )
+
+    def test_update_rule(self):
+        self.assertWithinBudget(
+            'event-retrieve-update', 'update_rule', 'put', reverse('event-retrieve-update', args=[self.series.pk]),
+            self.event_payload(is_recurring=True, recurrence_rule={'frequency': 'WEEKLY', 'interval': 3})
+        )
+
+    def test_delete(self):
+        self.assertWithinBudget('event-delete', 'delete', 'delete', reverse('event-delete', args=[self.series.pk]))
+        self.assertFalse(Event.objects.for_user(self.user).filter(pk=self.series.pk).exists())
+
+    def test_bulk_delete(self):
+        ids = list(Event.objects.for_user(self.user).values_list('pk', flat=True)[:20])
+        response = self.assertWithinBudget(
+            'event-bulk-delete', 'bulk_delete', 'post', reverse('event-bulk-delete'), {'ids': ids}
+        )
+        self.assertEqual(response.data['deleted'], 20)
+
+    def test_truncate(self):
+        self.assertWithinBudget(
+            'event-series-truncate', 'truncate', 'post', reverse('event-series-truncate', args=[self.series.pk]),
+            {'from_date': str(self.start.date() + timedelta(days=10))}
+        )
+
+    def test_batch(self):
+        window = self.window(days=14)
+        later = {'start_date': window['end_date'], 'end_date': str(self.start.date() + timedelta(days=28))}
+        response = self.assertWithinBudget('batch', 'batch', 'post', reverse('batch'), {'requests': [
+            {'type': 'current_user'},
+            {'type': 'events', **window, 'page_size': 100},
+            {'type': 'events', **later, 'page_size': 100},
+            {'type': 'event', 'pk': self.single.pk},
+        ]})
+        self.assertEqual([item['status'] for item in response.data['responses']], [200, 200, 200, 200])
+
+    def test_register(self):
+        self.client.credentials()
+        self.assertWithinBudget('register', 'register', 'post', reverse('register'), {
+            'username': 'newcomer', 'password': 'secret-password', 'email': 'newcomer@example.com'
+        }, expected_status=201)
+
+    def test_current_user(self):
+        self.assertWithinBudget('current-user', 'current_user', 'get', reverse('current-user'))
+
+    def test_set_time_zone(self):
+        response = self.assertWithinBudget(
+            'current-user', 'set_time_zone', 'patch', reverse('current-user'), {'time_zone': 'Europe/Berlin'}
+        )
+        self.assertEqual(response.data['time_zone'], 'Europe/Berlin')
+
+
+@override_settings(EVENT_WARMUP_WORKERS=0)
+class UserAPITestCase(TestCase):
+    """
+    An authenticated client for `user`, and helpers creating rows on a user's shard.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret-password')
+        cls.other = User.objects.create_user('intruder', 'intruder@example.com', 'secret-password')
+        cls.start = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def rule(self, user=None, **fields):
+        return RecurrenceRule.objects.using(shard_for_user(user or self.user)).intern(**fields)
+
+    def make_event(self, user=None, start=None, duration=timedelta(hours=1), rule=None, **fields):
+        user = user or self.user
+        start = start or self.start
+        fields.setdefault('title', 'Event')
+        return Event.objects.for_user(user).create(
+            user=user, start_time=start, end_time=start + duration,
+            is_recurring=rule is not None, recurrence_rule=rule, **fields
+        )
+
+    def exists(self, event):
+        return Event.objects.for_user(event.user_id).filter(pk=event.pk).exists()
+
+    def rule_exists(self, rule):
+        return RecurrenceRule.objects.using(rule._state.db).filter(pk=rule.pk).exists()
+
+
+class BulkDeleteTests(UserAPITestCase):
+    """
+    Set-based deletes only touch the selected events of the requesting user.
+    """
+
+    def bulk_delete(self, **criteria):
+        response = self.client.post(reverse('event-bulk-delete'), criteria, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data['deleted']
+
+    def test_delete_by_ids(self):
+        first, second, kept = (self.make_event(start=self.start + timedelta(days=i)) for i in range(3))
+        self.assertEqual(self.bulk_delete(ids=[first.pk, second.pk]), 2)
+        self.assertEqual([self.exists(event) for event in (first, second, kept)], [False, False, True])
+
+    def test_delete_by_date_range(self):
+        day = self.start.date()
+        inside = [self.make_event(start=self.start + timedelta(days=i)) for i in (0, 1)]
+        after = self.make_event(start=self.start + timedelta(days=2))
+        self.assertEqual(self.bulk_delete(start_date=str(day), end_date=str(day + timedelta(days=1))), 2)
+        self.assertFalse(any(self.exists(event) for event in inside))
+        self.assertTrue(self.exists(after))
+
+    def test_delete_by_created_range(self):
+        old, new = self.make_event(), self.make_event()
+        Event.objects.for_user(self.user).filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+        self.assertEqual(self.bulk_delete(created_after=(timezone.now() - timedelta(days=1)).isoformat()), 1)
+        self.assertTrue(self.exists(old))
+        self.assertFalse(self.exists(new))
+        self.assertEqual(self.bulk_delete(created_before=(timezone.now() - timedelta(days=1)).isoformat()), 1)
+        self.assertFalse(self.exists(old))
+
+    def test_other_users_events_are_untouched(self):
+        theirs = self.make_event(user=self.other)
+        self.assertEqual(self.bulk_delete(ids=[theirs.pk]), 0)
+        self.assertEqual(self.bulk_delete(start_date=str(self.start.date()), end_date=str(self.start.date())), 0)
+        self.assertTrue(self.exists(theirs))
+
+    def test_shared_rule_survives_until_unused(self):
+        rule = self.rule(frequency='DAILY', interval=1)
+        first, second = self.make_event(rule=rule), self.make_event(rule=rule)
+        self.assertEqual(self.bulk_delete(ids=[first.pk]), 1)
+        self.assertTrue(self.rule_exists(rule))
+        self.assertEqual(self.bulk_delete(ids=[second.pk]), 1)
+        self.assertFalse(self.rule_exists(rule))
+
+    def test_rules_are_deleted_with_one_raw_delete(self):
+        # delete_orphaned relies on the private QuerySet._raw_delete; this pins its behaviour
+        used = self.rule(frequency='DAILY', interval=1)
+        unused = self.rule(frequency='DAILY', interval=2)
+        self.make_event(rule=used)
+        with QueryLog() as log:
+            deleted = RecurrenceRule.objects.using(used._state.db).filter(pk__in=[used.pk, unused.pk]).delete_orphaned()
+        self.assertEqual(deleted, 1)
+        self.assertEqual(sum(query['sql'].startswith('DELETE') for query in log.queries), 1, log.report())
+        self.assertTrue(self.rule_exists(used))
+        self.assertFalse(self.rule_exists(unused))
+
+
+class SeriesTruncateTests(UserAPITestCase):
+    """
+    Truncation re-points a series at the interned rule with the new end date.
+    """
+
+    def truncate(self, event, from_date, expected_status=200):
+        response = self.client.post(
+            reverse('event-series-truncate', args=[event.pk]), {'from_date': str(from_date)}, format='json'
+        )
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response
+
+    def test_truncate_after_start(self):
+        rule = self.rule(frequency='DAILY', interval=1)
+        series = self.make_event(rule=rule)
+        from_date = self.start.date() + timedelta(days=10)
+        self.truncate(series, from_date)
+        series.refresh_from_db()
+        self.assertEqual(series.recurrence_rule.end_date, from_date - timedelta(days=1))
+        self.assertEqual(series.recurrence_rule.frequency, 'DAILY')
+        # The old rule was only used by this series
+        self.assertFalse(self.rule_exists(rule))
+
+    def test_truncate_keeps_shared_rule(self):
+        rule = self.rule(frequency='WEEKLY', interval=1)
+        series, sibling = self.make_event(rule=rule), self.make_event(rule=rule)
+        self.truncate(series, self.start.date() + timedelta(days=30))
+        sibling.refresh_from_db()
+        self.assertEqual(sibling.recurrence_rule_id, rule.pk)
+        self.assertIsNone(sibling.recurrence_rule.end_date)
+
+    def test_truncate_on_or_before_start_is_rejected(self):
+        series = self.make_event(rule=self.rule(frequency='DAILY', interval=1))
+        self.truncate(series, self.start.date(), expected_status=400)
+        self.truncate(series, self.start.date() - timedelta(days=1), expected_status=400)
+        series.refresh_from_db()
+        self.assertIsNone(series.recurrence_rule.end_date)
+
+    def test_single_event_is_rejected(self):
+        self.truncate(self.make_event(), self.start.date() + timedelta(days=5), expected_status=400)
+
+    def test_other_users_series_is_not_found(self):
+        theirs = self.make_event(user=self.other, rule=self.rule(user=self.other, frequency='DAILY', interval=1))
+        self.truncate(theirs, self.start.date() + timedelta(days=5), expected_status=404)
+        theirs.refresh_from_db()
+        self.assertIsNone(theirs.recurrence_rule.end_date)
+
+
+class RecurrenceRuleTests(UserAPITestCase):
+    """
+    Rules are interned by signature, and an event failing to save leaves no rule behind.
+    """
+
+    def test_save_computes_signature(self):
+        rule = RecurrenceRule(frequency='WEEKLY', interval=2, weekdays=['WED', 'MON'])
+        rule.save(using=shard_for_user(self.user))
+        self.assertEqual(rule.signature, rule_signature('WEEKLY', 2, weekdays=['MON', 'WED']))
+        self.assertEqual(self.rule(frequency='WEEKLY', interval=2, weekdays=['MON', 'WED']).pk, rule.pk)
+
+    def test_intern_returns_the_stored_rule(self):
+        rule = self.rule(frequency='MONTHLY', weekday='FRI', ordinal=2)
+        self.assertEqual(self.rule(frequency='MONTHLY', weekday='FRI', ordinal=2).pk, rule.pk)
+        self.assertNotEqual(self.rule(frequency='MONTHLY', weekday='FRI', ordinal=3).pk, rule.pk)
+
+    def test_failed_save_leaves_no_rule(self):
+        rules = RecurrenceRule.objects.using(shard_for_user(self.user))
+        before = rules.count()
+        payload = {
+            'title': 'Standup', 'start_time': self.start.isoformat(),
+            'end_time': (self.start + timedelta(minutes=15)).isoformat(),
+            'is_recurring': True, 'recurrence_rule': {'frequency': 'DAILY', 'interval': 7},
+        }
+        serializer = EventSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with mock.patch.object(Event, 'save', side_effect=DatabaseError("insert failed")):
+            with self.assertRaises(DatabaseError):
+                serializer.save(user=self.user)
+        self.assertEqual(rules.count(), before)
+
+    def test_window_length_is_capped(self):
+        start_date = self.start.date()
+        longest = {'start_date': start_date, 'end_date': start_date + timedelta(days=MAX_WINDOW_DAYS - 1)}
+        too_long = {'start_date': start_date, 'end_date': start_date + timedelta(days=MAX_WINDOW_DAYS)}
+        url = reverse('event-list-create')
+        self.assertEqual(self.client.get(url, longest).status_code, 200)
+        self.assertEqual(self.client.get(url, too_long).status_code, 400)
+        self.assertEqual(self.client.get(url, {**too_long, 'format': 'snapshot'}).status_code, 400)
+        response = self.client.post(reverse('batch'), {'requests': [
+            {'type': 'events', **{key: str(value) for key, value in longest.items()}},
+            {'type': 'events', **{key: str(value) for key, value in too_long.items()}},
+        ]}, format='json')
+        self.assertEqual([item['status'] for item in response.data['responses']], [200, 400])
+
+    def test_partial_rule_update_keeps_other_fields(self):
+        end_date = self.start.date() + timedelta(days=60)
+        rule = self.rule(frequency='WEEKLY', interval=1, end_date=end_date, weekdays=['MON', 'WED'])
+        event = self.make_event(rule=rule)
+        url = reverse('event-retrieve-update', args=[event.pk])
+        times = {'start_time': event.start_time.isoformat(), 'end_time': event.end_time.isoformat()}
+        response = self.client.patch(url, {
+            **times, 'is_recurring': True, 'recurrence_rule': {'interval': 2},
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['recurrence_rule'], {
+            'frequency': 'WEEKLY', 'interval': 2, 'end_date': end_date.isoformat(), 'weekdays': ['MON', 'WED'],
+            'weekday': None, 'ordinal': None,
+        })
+        # Merged rules are validated as a whole
+        response = self.client.patch(url, {
+            **times, 'is_recurring': True, 'recurrence_rule': {'frequency': 'DAILY'},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('weekdays', response.data['recurrence_rule'])
+
+    def test_partial_rule_without_frequency_is_rejected(self):
+        event = self.make_event()
+        response = self.client.patch(reverse('event-retrieve-update', args=[event.pk]), {
+            'start_time': event.start_time.isoformat(), 'end_time': event.end_time.isoformat(),
+            'is_recurring': True, 'recurrence_rule': {'interval': 2},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('frequency', response.data['recurrence_rule'])
+
+
+class UpcomingEventsTests(UserAPITestCase):
+    """
+    The next N occurrences merge single events with every active series.
+    """
+    url = reverse('event-upcoming')
+
+    def upcoming(self, **params):
+        response = self.client.get(self.url, {'after': self.start.isoformat(), **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(item['title'], parse_datetime(item['start_time'])) for item in response.data]
+
+    def test_singles_are_merged_with_series(self):
+        hour = timedelta(hours=1)
+        self.make_event(start=self.start - 24 * hour, title='Past')
+        self.make_event(start=self.start + hour, title='Single')
+        self.make_event(start=self.start + 30 * hour, title='Later')
+        self.make_event(start=self.start + 12 * hour, rule=self.rule(frequency='DAILY'), title='Daily')
+        self.make_event(user=self.other, start=self.start + 2 * hour, title='Not mine')
+        self.assertEqual(self.upcoming(limit=4), [
+            ('Single', self.start + hour),
+            ('Daily', self.start + 12 * hour),
+            ('Later', self.start + 30 * hour),
+            ('Daily', self.start + 36 * hour),
+        ])
+
+    def test_limit(self):
+        self.make_event(start=self.start + timedelta(hours=1), rule=self.rule(frequency='DAILY'), title='Daily')
+        self.assertEqual(len(self.upcoming()), UpcomingEventsView.default_limit)
+        self.assertEqual(len(self.upcoming(limit=12)), 12)
+        for limit in (0, UpcomingEventsView.max_limit + 1, 'x'):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.client.get(self.url, {'limit': limit}).status_code, 400)
+
+    def test_after(self):
+        self.make_event(start=self.start + timedelta(hours=1), rule=self.rule(frequency='DAILY'), title='Daily')
+        after = self.start + timedelta(days=3, hours=2)
+        self.assertEqual(self.upcoming(limit=1, after=after.isoformat()), [('Daily', self.start + timedelta(days=4, hours=1))])
+        for after in ('tomorrow', '2026-02-30T10:00'):
+            with self.subTest(after=after):
+                self.assertEqual(self.client.get(self.url, {'after': after}).status_code, 400)
+
+    def test_ended_series_are_skipped(self):
+        ended = self.rule(frequency='DAILY', end_date=(self.start - timedelta(days=5)).date())
+        self.make_event(start=self.start - timedelta(days=10), rule=ended, title='Ended')
+        self.make_event(start=self.start + timedelta(days=2), title='Single')
+        self.assertEqual(self.upcoming(), [('Single', self.start + timedelta(days=2))])
+
+    def test_after_at_the_ends_of_the_calendar(self):
+        self.make_event(start=self.start + timedelta(hours=1), title='Single')
+        # 21:00 in New York and 11:00 in Tokyo
+        start = datetime(self.start.year + 1, 1, 2, 2, tzinfo=dt_timezone.utc)
+        for zone in ('America/New_York', 'Asia/Tokyo'):
+            self.make_event(start=start, rule=self.rule(frequency='DAILY'), time_zone=zone, title=zone)
+        self.assertEqual(len(self.upcoming(after='0001-01-01T00:00:00', limit=3)), 3)
+        # New York's last occurrence would start in year 10000 (UTC), so it is not listed
+        last_days = [datetime(9999, 12, day, 2, tzinfo=dt_timezone.utc) for day in (30, 31)]
+        self.assertEqual(sorted(self.upcoming(after='9999-12-30T00:00:00', limit=10)), [
+            (zone, day) for zone in ('America/New_York', 'Asia/Tokyo') for day in last_days
+        ])
+
+
+@override_settings(EVENT_WARMUP_WORKERS=1)
+class WarmupTests(UserAPITestCase):
+    """
+    Warm windows are deduplicated per user, invalidated by writes, and only
+    served for exactly the warmed windows.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.window, _ = warmup.month_windows(timezone.now().date())
+        self.noon = datetime.combine(self.window[0], datetime.min.time(), tzinfo=dt_timezone.utc) + timedelta(hours=12)
+
+    def listing(self, start_date, end_date, **params):
+        response = self.client.get(reverse('event-list-create'), {
+            'start_date': str(start_date), 'end_date': str(end_date), **params
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['title'] for item in response.data['results']]
+
+    def wait_for_warmup(self, user_id):
+        deadline = time.monotonic() + 5
+        while user_id in warmup._in_flight:
+            self.assertLess(time.monotonic(), deadline, "warm-up did not finish")
+            time.sleep(0.005)
+
+    def test_in_flight_jobs_are_deduplicated(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def warm_user(user_id):
+            calls.append(user_id)
+            started.set()
+            release.wait(5)
+
+        with mock.patch.object(warmup, 'warm_user', side_effect=warm_user):
+            warmup.schedule(self.user.pk)
+            self.assertTrue(started.wait(5))
+            for _ in range(3):
+                warmup.schedule(self.user.pk)
+            release.set()
+            self.wait_for_warmup(self.user.pk)
+        # The burst while the first job ran folds into a single extra run
+        self.assertEqual(calls, [self.user.pk, self.user.pk])
+
+    def test_writes_invalidate_warm_windows(self):
+        self.make_event(start=self.noon, title='Before')
+        warmup.warm_user(self.user.pk)
+        self.assertEqual([item['title'] for item in warmup.cached_window(self.user.pk, *self.window)], ['Before'])
+        # Without the rebuild, so only the invalidation is observed
+        with mock.patch.object(warmup, 'schedule'):
+            response = self.client.post(reverse('event-list-create'), {
+                'title': 'After', 'start_time': (timezone.now() + timedelta(hours=2)).isoformat(),
+                'end_time': (timezone.now() + timedelta(hours=3)).isoformat(),
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIsNone(warmup.cached_window(self.user.pk, *self.window))
+
+    def test_only_exact_windows_are_served_from_cache(self):
+        start_date, end_date = self.window
+        self.make_event(start=self.noon, title='Stored')
+        warmup.warm_user(self.user.pk)
+        # Replace the warm payload, so responses show where they came from
+        version = cache.get(warmup._version_key(self.user.pk), 0)
+        cache.set(warmup._window_key(self.user.pk, version, start_date, end_date), [{'title': 'Cached'}])
+
+        self.assertEqual(self.listing(start_date, end_date), ['Cached'])
+        self.assertEqual(self.listing(start_date, end_date + timedelta(days=1)), ['Stored'])
+        self.assertEqual(self.listing(start_date, end_date, fields='id,title'), ['Stored'])
+        self.assertEqual(self.listing(start_date, end_date, include_archived=1), ['Stored'])
+
+    def test_warm_windows_load_only_their_events(self):
+        self.make_event(start=self.noon, title='Current')
+        self.make_event(start=self.noon - timedelta(days=90), title='Old')
+        with mock.patch('events.recurrence.expand_window', wraps=expand_window) as expand:
+            warmup.warm_user(self.user.pk)
+        self.assertEqual({event.title for call in expand.call_args_list for event in call.args[0]}, {'Current'})
+
+    @override_settings(EVENT_WARMUP_WORKERS=0)
+    def test_warm_windows_are_not_served_when_warming_is_off(self):
+        self.make_event(start=self.noon, title='Stored')
+        warmup.warm_user(self.user.pk)
+        self.assertIsNone(warmup.cached_window(self.user.pk, *self.window))
+        self.assertEqual(self.listing(*self.window), ['Stored'])
+
+
+class ArchiveTests(UserAPITestCase):
+    """
+    `archive_events` moves finished events in batches; the API can still read them.
+    """
+
+    def setUp(self):
+        super().setUp()
+        past = timezone.now() - timedelta(days=60)
+        self.finished = [self.make_event(start=past + timedelta(hours=i), title=f'Done {i}') for i in range(5)]
+        ended_rule = self.rule(frequency='DAILY', interval=1, end_date=(past + timedelta(days=5)).date())
+        self.ended_series = self.make_event(start=past, rule=ended_rule, title='Ended series')
+        self.running_series = self.make_event(start=past, rule=self.rule(frequency='WEEKLY', interval=1))
+        self.upcoming = self.make_event(title='Upcoming')
+
+    def archive(self, **options):
+        out = StringIO()
+        call_command('archive_events', older_than_days=30, stdout=out, **options)
+        return out.getvalue()
+
+    def test_moves_finished_events_in_batches(self):
+        output = self.archive(batch_size=2)
+        self.assertIn("Archived 6 event(s) in 3 batch(es).", output)
+        moved = self.finished + [self.ended_series]
+        self.assertFalse(any(self.exists(event) for event in moved))
+        archived = ArchivedEvent.objects.for_user(self.user)
+        self.assertEqual(set(archived.values_list('pk', flat=True)), {event.pk for event in moved})
+        self.assertEqual(archived.get(pk=self.ended_series.pk).recurrence_rule_id, self.ended_series.recurrence_rule_id)
+        self.assertTrue(self.exists(self.running_series))
+        self.assertTrue(self.exists(self.upcoming))
+
+    def test_max_batches_and_resume(self):
+        self.archive(batch_size=2, max_batches=1)
+        self.assertEqual(ArchivedEvent.objects.for_user(self.user).count(), 2)
+        self.archive(batch_size=2)
+        self.assertEqual(ArchivedEvent.objects.for_user(self.user).count(), 6)
+
+    def test_dry_run_moves_nothing(self):
+        self.assertIn("6 event(s) would be archived", self.archive(dry_run=True))
+        self.assertFalse(ArchivedEvent.objects.for_user(self.user).exists())
+
+    @override_settings(EVENT_WARMUP_WORKERS=1)
+    def test_invalidates_warm_windows(self):
+        warmup.warm_user(self.user.pk)
+        start_date, end_date = warmup.month_windows(timezone.now().date())[0]
+        self.assertIsNotNone(warmup.cached_window(self.user.pk, start_date, end_date))
+        self.archive()
+        self.assertIsNone(warmup.cached_window(self.user.pk, start_date, end_date))
+
+    def test_listing_and_retrieve_include_archived_on_request(self):
+        self.archive()
+        archived = self.finished[0]
+        listed = self.client.get(reverse('event-list-create'), {'page_size': 100})
+        self.assertNotIn(archived.pk, [item['id'] for item in listed.data['results']])
+        listed = self.client.get(reverse('event-list-create'), {'page_size': 100, 'include_archived': 1})
+        self.assertIn(archived.pk, [item['id'] for item in listed.data['results']])
+
+        detail = reverse('event-retrieve-update', args=[archived.pk])
+        self.assertEqual(self.client.get(detail).status_code, 404)
+        response = self.client.get(detail, {'include_archived': 1})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['title'], archived.title)
+
+
+@skipUnless(len(get_shards()) > 1, "needs several shards, e.g. settings_memory_sharded")
+@override_settings(SHARD_MOVE_GRACE_SECONDS=0)
+class ShardMoveTests(UserAPITestCase):
+    """
+    Moves copy a user's rows with their ids, can be resumed, and block writes meanwhile.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()  # Placements cached by earlier tests
+        self.source = shard_for_user(self.user)
+        self.target = next(alias for alias in get_shards() if alias != self.source)
+        self.series = self.make_event(rule=self.rule(frequency='WEEKLY', interval=2), title='Series')
+        self.single = self.make_event(title='Single')
+
+    def rows(self, alias):
+        return sorted(Event.objects.using(alias).filter(user=self.user).values_list('pk', 'title'))
+
+    def placement(self):
+        return UserShard.objects.get(user=self.user)
+
+    def test_move_keeps_ids(self):
+        before = self.rows(self.source)
+        self.assertEqual(move_user(self.user.pk, self.target), 2)
+        self.assertEqual(self.rows(self.target), before)
+        self.assertEqual(self.rows(self.source), [])
+        placement = self.placement()
+        self.assertEqual((placement.database, placement.moving_to, placement.previous_database), (self.target, None, None))
+        self.assertEqual(shard_for_user(self.user), self.target)
+        moved = Event.objects.for_user(self.user).get(pk=self.series.pk)
+        self.assertEqual(moved.recurrence_rule.interval, 2)
+
+    def test_interrupted_copy_is_resumed(self):
+        with mock.patch.object(QuerySet, 'bulk_create', side_effect=DatabaseError("copy failed")):
+            with self.assertRaises(DatabaseError):
+                move_user(self.user.pk, self.target)
+        self.assertEqual(self.placement().moving_to, self.target)
+        self.assertEqual(self.rows(self.target), [])
+        self.assertFalse(RecurrenceRule.objects.using(self.target).exists())
+        self.assertEqual(move_user(self.user.pk, self.target), 2)
+        self.assertEqual(len(self.rows(self.target)), 2)
+        self.assertEqual(self.rows(self.source), [])
+
+    def test_interrupted_clean_up_is_finished(self):
+        delete_user_rows = sharding.delete_user_rows
+
+        def fail_on_source(alias, user_id):
+            if alias == self.source:
+                raise DatabaseError("delete failed")
+            delete_user_rows(alias, user_id)
+
+        with mock.patch.object(sharding, 'delete_user_rows', side_effect=fail_on_source):
+            with self.assertRaises(DatabaseError):
+                move_user(self.user.pk, self.target)
+        self.assertEqual(self.placement().previous_database, self.source)
+        self.assertEqual(len(self.rows(self.source)), 2)
+        self.assertEqual(move_user(self.user.pk, self.target), 0)
+        self.assertEqual(self.rows(self.source), [])
+        self.assertIsNone(self.placement().previous_database)
+
+    def test_writes_are_refused_while_moving(self):
+        UserShard.objects.filter(user=self.user).update(moving_to=self.target)
+        response = self.client.delete(reverse('event-delete', args=[self.single.pk]))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        self.assertTrue(self.exists(self.single))
+
+    def test_writes_ignore_a_stale_cached_placement(self):
+        move_user(self.user.pk, self.target)
+        # Another process still caches the old placement
+        cache.set(f'event-shard:{self.user.pk}', self.source)
+        response = self.client.post(reverse('event-list-create'), {
+            'title': 'After the move', 'start_time': self.start.isoformat(),
+            'end_time': (self.start + timedelta(hours=1)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIn((response.data['id'], 'After the move'), self.rows(self.target))
+        self.assertEqual(self.rows(self.source), [])
+
+
+@override_settings(COMPRESSION_MIN_SIZE=256)
+class CompressionTests(UserAPITestCase):
+    """
+    Responses are compressed as negotiated, with randomized lengths against BREACH.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(10):
+            Event.objects.for_user(cls.user).create(
+                user=cls.user, title=f'Planning session {i}', description='Quarterly planning. ' * 10,
+                start_time=cls.start + timedelta(days=i), end_time=cls.start + timedelta(days=i, hours=1)
+            )
+
+    def get(self, accept_encoding):
+        return self.client.get(reverse('event-list-create'), HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    @skipUnless(brotli, "the brotli package is not installed")
+    def test_brotli_is_preferred_when_accepted(self):
+        plain = self.get('identity')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        response = self.get('gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    def test_gzip_without_brotli(self):
+        plain = self.get('identity')
+        response = self.get('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_small_responses_are_not_compressed(self):
+        with override_settings(COMPRESSION_MIN_SIZE=1 << 20):
+            self.assertFalse(self.get('br').has_header('Content-Encoding'))
+
+    @skipUnless(brotli, "the brotli package is not installed")
+    def test_brotli_length_is_randomized(self):
+        content = b'{"title": "Planning session"}' * 100
+        sizes = set()
+        for quality in (0, 4, 11):
+            for _ in range(20):
+                compressed = compress_brotli(content, quality=quality, max_random_bytes=100)
+                self.assertEqual(brotli.decompress(compressed), content)
+                sizes.add(len(compressed))
+        self.assertGreater(len(sizes), 1)
+
+
+class SparseFieldsetTests(UserAPITestCase):
+    """
+    `?fields=` limits the output, and the query, without breaking window expansion.
+    """
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('event-list-create'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+    def test_window_still_expands_recurring_events(self):
+        self.make_event(rule=self.rule(frequency='DAILY', interval=1), title='Standup')
+        start_date = self.start.date()
+        response = self.client.get(reverse('event-list-create'), {
+            'fields': 'id,title', 'start_date': start_date.isoformat(),
+            'end_date': (start_date + timedelta(days=2)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([set(item) for item in response.data['results']], [{'id', 'title'}] * 3)
+
+
+class ProfilingTests(SimpleTestCase):
+    """
+    Sampled stacks are final once sampling stops, and profiles round-trip through disk.
+    """
+
+    def sample(self):
+        sampler = StackSampler(0.001)
+        thread_id = threading.get_ident()
+        samples = sampler.start(thread_id)
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline or not samples:
+            sum(range(1000))
+        sampler.stop(thread_id)
+        return samples
+
+    def test_samples_are_final_after_stop(self):
+        samples = self.sample()
+        frozen = Counter(samples)
+        time.sleep(0.02)
+        self.assertEqual(samples, frozen)
+        self.assertTrue(any('sample (events/tests.py:' in stack for stack in samples))
+
+    def test_write_rotate_and_read(self):
+        samples = self.sample()
+        tags = {'endpoint': 'event-list-create', 'duration_ms': 51.5, 'window_days': 31}
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [write_profile(directory, f'profile-{i}', samples, tags, max_files=2) for i in range(3)]
+            self.assertEqual(sorted(os.listdir(directory)), [os.path.basename(path) for path in paths[1:]])
+            self.assertEqual(read_profile(paths[-1]), (tags, samples))
+
+
+class BatchTests(UserAPITestCase):
+    """
+    Batched windows are paginated like the listing, with links to it.
+    """
+
+    def test_window_pages_match_the_listing(self):
+        self.make_event(rule=self.rule(frequency='DAILY'), title='Standup')
+        start_date = self.start.date()
+        window = {'type': 'events', 'start_date': str(start_date), 'end_date': str(start_date + timedelta(days=4))}
+        response = self.client.post(reverse('batch'), {'requests': [
+            {**window, 'page_size': 2},
+            {**window, 'page_size': 2, 'page': 3, 'fields': 'id,start_time'},
+        ]}, format='json')
+        first, last = [item['body'] for item in response.data['responses']]
+        self.assertEqual(set(first), {'count', 'next', 'previous', 'results'})
+        self.assertEqual((first['count'], len(first['results']), first['previous']), (5, 2, None))
+        self.assertEqual((len(last['results']), last['next']), (1, None))
+
+        listing = self.client.get(first['next'])
+        self.assertEqual(listing.status_code, 200, listing.content)
+        self.assertEqual(listing.data['count'], 5)
+        self.assertIn('fields=id%2Cstart_time', last['previous'])
+        self.assertEqual(self.client.get(last['previous']).data['results'], [
+            {'id': item['id'], 'start_time': item['start_time']} for item in listing.data['results']
+        ])
+
+    def test_window_at_the_end_of_the_calendar(self):
+        # 07:00 and 21:00 in New York; the last 21:00 occurrence would start in year 10000 (UTC)
+        for hour in (12, 26):
+            start = datetime(self.start.year + 1, 1, 1, tzinfo=dt_timezone.utc) + timedelta(hours=hour)
+            self.make_event(start=start, rule=self.rule(frequency='DAILY'), time_zone='America/New_York')
+        window = {'start_date': '9999-12-01', 'end_date': '9999-12-31'}
+        response = self.client.post(reverse('batch'), {'requests': [{'type': 'events', **window}]}, format='json')
+        [item] = response.data['responses']
+        self.assertEqual(item['status'], 200, item['body'])
+        self.assertEqual(item['body']['count'], 31 + 30)
+        for params in (window, {**window, 'format': 'snapshot'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('event-list-create'), params).status_code, 200)
+
+
+@skipUnless(multiprocessing.get_start_method() == 'fork', "workers only see in-memory databases when forked")
+@override_settings(EVENT_WARMUP_WORKERS=0)
+class ExportOccurrencesTests(TransactionTestCase):
+    """
+    `export_occurrences` splits users into id-range shards, in worker processes.
+
+    Rows are committed (not in a test transaction), so forked workers read them.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.start_date = date(2026, 3, 2)
+        self.end_date = date(2026, 3, 6)
+        nine = datetime(2026, 3, 2, 9, tzinfo=dt_timezone.utc)
+        self.users = [User.objects.create_user(f'exporter{i}', f'exporter{i}@example.com', 'pw') for i in range(3)]
+        first, second, third = self.users
+
+        def create(model, user, start, rule=None, **fields):
+            return model.objects.using(shard_for_user(user)).create(
+                user=user, start_time=start, end_time=start + timedelta(hours=1),
+                is_recurring=rule is not None, recurrence_rule=rule, **fields
+            )
+
+        def rule(user, **fields):
+            return RecurrenceRule.objects.using(shard_for_user(user)).intern(**fields)
+
+        create(Event, first, nine - timedelta(days=10), rule(first, frequency='DAILY'), title='Daily')
+        create(Event, first, nine + timedelta(days=1), title='Single')
+        create(Event, second, nine + timedelta(days=30), title='Outside')
+        # Archived rows keep the ids and timestamps of the events they came from
+        create(ArchivedEvent, second, nine + timedelta(days=2), title='Archived', id=1000, created_at=nine, updated_at=nine)
+        create(Event, third, nine - timedelta(days=3), rule(third, frequency='WEEKLY'), title='Weekly')
+        # 5 daily + 1 single, 1 archived, 1 weekly (started on a Friday)
+        self.expected = {first.pk: 6, second.pk: 1, third.pk: 1}
+
+    def export(self, output, workers):
+        call_command(
+            'export_occurrences', output=output, workers=workers, chunk_size=2, include_archived=True,
+            start_date=self.start_date, end_date=self.end_date, stdout=StringIO()
+        )
+        with open(os.path.join(output, 'manifest.json')) as handle:
+            return json.load(handle)
+
+    def read_shard(self, path):
+        with gzip.open(path, 'rt', newline='') as handle:
+            return list(csv.DictReader(handle))
+
+    def test_parallel_export(self):
+        with tempfile.TemporaryDirectory() as output, tempfile.TemporaryDirectory() as serial:
+            manifest = self.export(output, workers=2)
+            first, second, third = [user.pk for user in self.users]
+            self.assertEqual(
+                [(shard['file'], shard['first_user_id'], shard['last_user_id']) for shard in manifest['shards']],
+                [('occurrences-00000.csv.gz', first, second), ('occurrences-00001.csv.gz', third, third)]
+            )
+            self.assertEqual(manifest['rows'], sum(self.expected.values()))
+
+            per_user = Counter()
+            for shard in manifest['shards']:
+                path = os.path.join(output, shard['file'])
+                with open(path, 'rb') as handle:
+                    content = handle.read()
+                self.assertEqual(shard['sha256'], hashlib.sha256(content).hexdigest())
+                self.assertEqual(shard['bytes'], len(content))
+                rows = self.read_shard(path)
+                self.assertEqual(shard['rows'], len(rows))
+                for row in rows:
+                    self.assertTrue(shard['first_user_id'] <= int(row['user_id']) <= shard['last_user_id'])
+                    per_user[int(row['user_id'])] += 1
+            self.assertEqual(per_user, self.expected)
+            rows = self.read_shard(os.path.join(output, manifest['shards'][0]['file']))
+            archived = [row for row in rows if row['archived'] == 'True']
+            self.assertEqual([row['title'] for row in archived], ['Archived'])
+
+            # Same shards as an export in this process
+            in_process = self.export(serial, workers=0)
+            for shard, expected in zip(manifest['shards'], in_process['shards']):
+                self.assertEqual(
+                    self.read_shard(os.path.join(output, shard['file'])),
+                    self.read_shard(os.path.join(serial, expected['file']))
+                )
+
+
+class AdminTests(UserAPITestCase):
+    """
+    Set-based admin actions, read-only archives, and counts that stay bounded.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'secret-password')
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+
+    def test_delete_with_rules_action(self):
+        shared = self.rule(frequency='WEEKLY')
+        unused = self.rule(frequency='DAILY')
+        doomed = [self.make_event(rule=unused), self.make_event(rule=shared)]
+        kept = self.make_event(rule=shared)
+        # The user id filter reads from the user's shard
+        url = f"{reverse('admin:events_event_changelist')}?user_id={self.user.pk}"
+        with mock.patch.object(warmup, 'events_changed') as events_changed:
+            response = self.client.post(url, {
+                'action': 'delete_with_rules', '_selected_action': [event.pk for event in doomed],
+            }, follow=True)
+        self.assertContains(response, "Deleted 2 event(s).")
+        self.assertEqual([self.exists(event) for event in (*doomed, kept)], [False, False, True])
+        self.assertEqual((self.rule_exists(unused), self.rule_exists(shared)), (False, True))
+        events_changed.assert_called_once_with(self.user.pk)
+
+    def test_archived_events_are_read_only(self):
+        model_admin = site._registry[ArchivedEvent]
+        request = RequestFactory().get('/')
+        request.user = self.admin_user
+        self.assertEqual(
+            [model_admin.has_add_permission(request), model_admin.has_change_permission(request),
+             model_admin.has_delete_permission(request)],
+            [False, False, False]
+        )
+        self.assertNotIn('delete_selected', model_admin.get_actions(request))
+
+    def test_paginator_counts_are_capped(self):
+        for i in range(5):
+            self.make_event(start=self.start + timedelta(days=i))
+        events = Event.objects.for_user(self.user).order_by('pk')
+        unfiltered = Event.objects.using(events.db).order_by('pk')
+        # Planner estimates are PostgreSQL-only; SQLite counts instead
+        self.assertIsNone(EstimatedCountPaginator(unfiltered, 2).estimated_rows(unfiltered))
+        self.assertEqual(EstimatedCountPaginator(unfiltered, 2).count, 5)
+        with mock.patch('events.admin.COUNT_LIMIT', 3):
+            paginator = EstimatedCountPaginator(events, 2)
+            self.assertEqual((paginator.count, paginator.num_pages), (3, 2))
+
+
+class LoadTestCommandTests(SimpleTestCase):
+    """
+    `loadtest` rejects operation mixes `random.choices` cannot use.
+    """
+
+    def test_rejects_negative_and_invalid_weights(self):
+        for mix in ('list=1,create=-1', 'list=nan', 'list=0,create=0', 'list=x', 'fetch=1'):
+            with self.subTest(mix=mix), self.assertRaises(CommandError):
+                call_command('loadtest', mix=mix, stdout=StringIO())
+
+
+class RecurrenceDatesTests(SimpleTestCase):
+    """
+    Series dates agree with dateutil's rrule for the same rule and start date.
+    """
+    RULES = (
+        {'frequency': 'DAILY', 'interval': 1},
+        {'frequency': 'DAILY', 'interval': 3},
+        {'frequency': 'WEEKLY', 'interval': 1},
+        {'frequency': 'WEEKLY', 'interval': 2, 'weekdays': ['MON', 'THU', 'SUN']},
+        {'frequency': 'WEEKLY', 'interval': 3, 'weekdays': ['SAT']},
+        {'frequency': 'MONTHLY', 'interval': 1},
+        {'frequency': 'MONTHLY', 'interval': 2},
+        {'frequency': 'MONTHLY', 'interval': 1, 'weekday': 'TUE', 'ordinal': 2},
+        {'frequency': 'MONTHLY', 'interval': 1, 'weekday': 'FRI', 'ordinal': 5},
+        {'frequency': 'YEARLY', 'interval': 1},
+        {'frequency': 'YEARLY', 'interval': 3},
+        {'frequency': 'DAILY', 'interval': 2, 'end_date': date(2025, 3, 1)},
+    )
+    # Month ends (day 31), February 29th and a Sunday
+    STARTS = (date(2024, 1, 31), date(2024, 2, 29), date(2025, 3, 30), date(2023, 12, 31))
+
+    def reference(self, fields, start, until=None, count=None):
+        """rrule's dates for the rule from `start`, up to `until` and the rule's end date."""
+        options = {'interval': fields['interval'], 'dtstart': datetime.combine(start, datetime.min.time()), 'wkst': rrule.MO}
+        if fields.get('weekdays'):
+            options['byweekday'] = [rrule.weekdays[WEEKDAY_INDEX[day]] for day in fields['weekdays']]
+        if fields.get('ordinal'):
+            options['byweekday'] = rrule.weekdays[WEEKDAY_INDEX[fields['weekday']]]
+            options['bysetpos'] = fields['ordinal']
+        ends = [day for day in (until, fields.get('end_date')) if day]
+        if ends:
+            options['until'] = datetime.combine(min(ends), datetime.min.time())
+        dates = rrule.rrule(getattr(rrule, fields['frequency']), **options)
+        return [moment.date() for moment in islice(dates, count)]
+
+    def cases(self):
+        return [
+            (fields, start, series_key(RecurrenceRule(**fields), start))
+            for fields in self.RULES for start in self.STARTS
+        ]
+
+    def test_series_dates_match_rrule(self):
+        for fields, start, key in self.cases():
+            with self.subTest(rule=fields, start=start):
+                self.assertEqual(list(islice(series_dates(*key, start), 40)), self.reference(fields, start, count=40))
+
+    def test_window_dates_match_rrule(self):
+        for fields, start, key in self.cases():
+            for offset, days in ((-10, 60), (0, MAX_WINDOW_DAYS - 1), (400, 120), (3000, 365)):
+                window_start = start + timedelta(days=offset)
+                window_end = window_start + timedelta(days=days)
+                with self.subTest(rule=fields, start=start, window=(window_start, window_end)):
+                    dates = window_dates(*key, window_start, window_end)
+                    expected = [day for day in self.reference(fields, start, until=window_end) if day >= window_start]
+                    self.assertEqual(list(dates[bisect_left(dates, start):]), expected)
+
+
+class TimeZoneTests(SimpleTestCase):
+    """
+    Series repeat in their zone's wall time, and the cached transition tables
+    agree with zoneinfo.
+    """
+
+    def test_conversions_match_zoneinfo(self):
+        for name in ('Europe/Berlin', 'America/New_York', 'Australia/Lord_Howe', 'Asia/Kolkata'):
+            zone = ZoneInfo(name)
+            moment = datetime(2026, 1, 1, 0, 30, tzinfo=dt_timezone.utc)
+            while moment.year == 2026:
+                wall = moment.astimezone(zone).replace(tzinfo=None)
+                self.assertEqual(utc_to_wall(name, moment), wall, (name, moment))
+                # Ambiguous wall times resolve to the earlier offset (fold=0)
+                expected = wall.replace(tzinfo=zone, fold=0).astimezone(dt_timezone.utc)
+                self.assertEqual(wall_to_utc(name, wall.date(), wall.time()), expected, (name, wall))
+                moment += timedelta(minutes=97)
+
+    def test_series_keeps_wall_time_across_dst(self):
+        # 09:00 in Berlin is 07:00 UTC in summer and 08:00 UTC in winter
+        start = datetime(2026, 10, 19, 7, tzinfo=dt_timezone.utc)
+        event = Event(
+            pk=1, title='Standup', start_time=start, end_time=start + timedelta(minutes=15), is_recurring=True,
+            time_zone='Europe/Berlin', recurrence_rule=RecurrenceRule(frequency='WEEKLY', interval=1)
+        )
+        occurrences = expand_window([event], date(2026, 10, 19), date(2026, 11, 2))
+        self.assertEqual(
+            [occurrence.start_time.astimezone(ZoneInfo('Europe/Berlin')).hour for occurrence in occurrences],
+            [9, 9, 9]
+        )
+        self.assertEqual([occurrence.start_time.hour for occurrence in occurrences], [7, 8, 8])
+        self.assertEqual(occurrences[-1].end_time - occurrences[-1].start_time, timedelta(minutes=15))
+
+    def test_first_and_last_years(self):
+        for name in ('America/New_York', 'Asia/Tokyo'):
+            zone = ZoneInfo(name)
+            for moment in (datetime(1, 1, 2, 12, tzinfo=dt_timezone.utc), datetime(9999, 12, 30, 12, tzinfo=dt_timezone.utc)):
+                wall = moment.astimezone(zone).replace(tzinfo=None)
+                self.assertEqual(utc_to_wall(name, moment), wall, (name, moment))
+                self.assertEqual(wall_to_utc(name, wall.date(), wall.time()), moment, (name, wall))
+        # Wall times beyond the datetime range are clamped to its ends
+        self.assertEqual(utc_to_wall('America/New_York', datetime.min.replace(tzinfo=dt_timezone.utc)), datetime.min)
+        self.assertEqual(utc_to_wall('Asia/Tokyo', datetime.max.replace(tzinfo=dt_timezone.utc)), datetime.max)
+
+
+@skipUnless(getattr(settings, 'DATABASE_REPLICAS', None), "needs replicas, e.g. settings_memory_replicas")
+@override_settings(EVENT_WARMUP_WORKERS=0)
+class ReplicaRoutingTests(TestCase):
+    """
+    Safe reads go to a healthy replica; writes and reads right after a write do not.
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', 'reader@example.com', 'secret-password')
+        cls.primary = shard_for_user(cls.user)
+        start = timezone.now() + timedelta(days=1)
+        cls.event = Event.objects.for_user(cls.user).create(
+            user=cls.user, title='Standup', start_time=start, end_time=start + timedelta(minutes=15)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        replicas._health.clear()
+        cache.delete(replicas._sticky_key(self.user.pk))
+
+    def event_aliases(self, method, url, data=None):
+        """Databases the request's event queries ran on."""
+        with QueryLog() as log:
+            response = getattr(self.client, method)(url, data, format='json' if method != 'get' else None)
+        self.assertLess(response.status_code, 400, response.content)
+        return {query['alias'] for query in log.queries if 'events_event' in query['sql']}
+
+    def test_list_and_retrieve_read_from_replica(self):
+        replica_aliases = set(replicas.get_replicas(self.primary))
+        self.assertTrue(self.event_aliases('get', reverse('event-list-create')) <= replica_aliases)
+        detail = reverse('event-retrieve-update', args=[self.event.pk])
+        self.assertTrue(self.event_aliases('get', detail) <= replica_aliases)
+
+    def test_write_goes_to_primary_and_sticks(self):
+        start = timezone.now() + timedelta(days=2)
+        payload = {
+            'title': 'Moved', 'start_time': start.isoformat(), 'end_time': (start + timedelta(hours=1)).isoformat(),
+            'is_recurring': False, 'recurrence_rule': None,
+        }
+        detail = reverse('event-retrieve-update', args=[self.event.pk])
+        self.assertEqual(self.event_aliases('put', detail, payload), {self.primary})
+        self.assertEqual(self.event_aliases('get', detail), {self.primary})
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(replicas, 'replica_lag', return_value=3600):
+            self.assertEqual(self.event_aliases('get', reverse('event-list-create')), {self.primary})
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        with mock.patch.object(replicas, 'replica_lag', side_effect=OperationalError('connection refused')):
+            self.assertEqual(self.event_aliases('get', reverse('event-list-create')), {self.primary})
+
+    def test_health_is_checked_once_per_interval(self):
+        with mock.patch.object(replicas, 'replica_lag', return_value=0) as replica_lag:
+            self.event_aliases('get', reverse('event-list-create'))
+            self.event_aliases('get', reverse('event-list-create'))
+        self.assertEqual(replica_lag.call_count, len(replicas.get_replicas(self.primary)))
@@ -0,0 +1,146 @@
+"""
+Cached time zone transition tables for recurrence expansion.
+
+Series repeat in their own zone's wall time ("9am every Monday" stays at 9am
+across DST), so each occurrence's wall time has to be converted to UTC. Doing
+that through `zoneinfo` for every occurrence is slow. Instead the UTC offset
+changes of a zone are computed once per (zone, year) and cached. Converting a
+wall time is then a bisect over at most a few boundaries. UTC itself skips the
+tables entirely.
+
+A transition at UTC instant T from offset `old` to `new` splits wall time at
+T + max(old, new). Wall times before the boundary use `old`. This resolves
+wall times that do not exist (spring forward) and ambiguous ones (fall back)
+to the earlier offset, as `zoneinfo` does with `fold=0`.
+"""
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+
+UTC_NAME = 'UTC'
+
+# How long a user's default zone is cached; other processes see a change after at most this long
+PROFILE_CACHE_TIMEOUT = 300
+
+# Largest UTC offset in use; windows queried in UTC are widened by this much
+MAX_UTC_OFFSET = timedelta(hours=14)
+
+# Transition tables stay a day clear of the ends of the datetime range, so any
+# offset can be applied to the instants they look up
+FIRST_TIMESTAMP = int(datetime.min.replace(tzinfo=timezone.utc).timestamp()) + 86400
+LAST_TIMESTAMP = int(datetime.max.replace(tzinfo=timezone.utc).timestamp()) - 86400
+
+ZoneYear = namedtuple('ZoneYear', ['utc_transitions', 'wall_boundaries', 'offsets'])
+
+
+def validate_time_zone(name):
+    """Field validator accepting IANA zone names such as 'Europe/Berlin'."""
+    try:
+        get_zone(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"Unknown time zone: {name!r}.")
+
+
+def widen(moment, delta):
+    """`moment + delta`, clamped to the datetime range (for query bounds near year 1 or 9999)."""
+    try:
+        return moment + delta
+    except OverflowError:
+        return (datetime.max if delta > timedelta(0) else datetime.min).replace(tzinfo=moment.tzinfo)
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    return ZoneInfo(name)
+
+
+@lru_cache(maxsize=4096)
+def zone_year(name, year):
+    """
+    Offset changes of zone `name` around `year`, as a ZoneYear.
+
+    `offsets[i]` applies before `utc_transitions[i]` (in UTC) and before
+    `wall_boundaries[i]` (wall times, labelled UTC). The last offset applies
+    after the last transition. The table covers one day beyond each end of the
+    year, so every wall time of the year can be looked up; in years 1 and 9999
+    it stops a day short of the end of the datetime range instead.
+    """
+    zone = get_zone(name)
+    start = max(int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()) - 86400, FIRST_TIMESTAMP)
+    end = min(int(datetime(year, 12, 31, tzinfo=timezone.utc).timestamp()) + 2 * 86400, LAST_TIMESTAMP)
+
+    def offset_at(timestamp):
+        return datetime.fromtimestamp(timestamp, zone).utcoffset()
+
+    utc_transitions, wall_boundaries, offsets = [], [], [offset_at(start)]
+    # Zones change offset at most once a day, so step by days and bisect to the second
+    for day_start in range(start, end, 86400):
+        day_end = min(day_start + 86400, end)
+        if offset_at(day_end) == offsets[-1]:
+            continue
+        low, high = day_start, day_end
+        while high - low > 1:
+            middle = (low + high) // 2
+            if offset_at(middle) == offsets[-1]:
+                low = middle
+            else:
+                high = middle
+        old, new = offsets[-1], offset_at(high)
+        transition = datetime.fromtimestamp(high, timezone.utc)
+        utc_transitions.append(transition)
+        wall_boundaries.append(transition + max(old, new))
+        offsets.append(new)
+    return ZoneYear(tuple(utc_transitions), tuple(wall_boundaries), tuple(offsets))
+
+
+def wall_to_utc(name, day, clock):
+    """UTC datetime of wall time `clock` (naive) on local `day` in zone `name`."""
+    wall = datetime.combine(day, clock, tzinfo=timezone.utc)
+    if name == UTC_NAME:
+        return wall
+    table = zone_year(name, day.year)
+    return wall - table.offsets[bisect_right(table.wall_boundaries, wall)]
+
+
+def utc_to_wall(name, moment):
+    """Wall time (naive) of the aware datetime `moment` in zone `name`."""
+    moment = moment.astimezone(timezone.utc)
+    if name == UTC_NAME:
+        return moment.replace(tzinfo=None)
+    table = zone_year(name, moment.year)
+    return widen(moment, table.offsets[bisect_right(table.utc_transitions, moment)]).replace(tzinfo=None)
+
+
+def local_date(event):
+    """Date of an event's start in its own time zone."""
+    return utc_to_wall(event.time_zone, event.start_time).date()
+
+
+def _cache_key(user_id):
+    return f'user-time-zone:{user_id}'
+
+
+def user_time_zone(user):
+    """Default zone for new events of `user` (a user instance or id); UTC without a profile."""
+    from .models import UserProfile
+
+    user_id = getattr(user, 'pk', user)
+    name = cache.get(_cache_key(user_id))
+    if name is None:
+        name = UserProfile.objects.filter(user_id=user_id).values_list('time_zone', flat=True).first() or UTC_NAME
+        cache.set(_cache_key(user_id), name, PROFILE_CACHE_TIMEOUT)
+    return name
+
+
+def set_user_time_zone(user, name):
+    """Store the default zone of `user`; existing events keep their own zone."""
+    from .models import UserProfile
+
+    user_id = getattr(user, 'pk', user)
+    UserProfile.objects.update_or_create(user_id=user_id, defaults={'time_zone': name})
+    cache.set(_cache_key(user_id), name, PROFILE_CACHE_TIMEOUT)
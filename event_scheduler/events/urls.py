@@ -1,12 +1,19 @@
 
 from django.urls import path
-from .views import EventListCreateView, EventRetrieveUpdateView, EventDeleteView, RegisterView, CurrentUserView
+from .views import (
+    EventListCreateView, EventRetrieveUpdateView, EventDeleteView, EventBulkDeleteView,
+    EventSeriesTruncateView, UpcomingEventsView, RegisterView, CurrentUserView, BatchView
+)
 
 
 urlpatterns = [
     path('events/', EventListCreateView.as_view(), name='event-list-create'),
+    path('events/upcoming/', UpcomingEventsView.as_view(), name='event-upcoming'),
     path('events/<int:pk>/', EventRetrieveUpdateView.as_view(), name='event-retrieve-update'),
     path('events/delete/<int:pk>/', EventDeleteView.as_view(), name='event-delete'),
+    path('events/bulk-delete/', EventBulkDeleteView.as_view(), name='event-bulk-delete'),
+    path('events/<int:pk>/truncate/', EventSeriesTruncateView.as_view(), name='event-series-truncate'),
     path('register/', RegisterView.as_view(), name='register'),
     path('current-user/', CurrentUserView.as_view(), name='current-user'),
+    path('batch/', BatchView.as_view(), name='batch'),
 ]
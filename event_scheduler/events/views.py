@@ -1,18 +1,55 @@
 # event_scheduler_project/events/views.py
 from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated, AllowAny
 from rest_framework.pagination import PageNumberPagination
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from datetime import datetime, timedelta
-from dateutil import rrule
-from dateutil.relativedelta import relativedelta
-from .models import Event, RecurrenceRule
-from .serializers import EventSerializer
+from django.utils.dateparse import parse_datetime
+from datetime import datetime, time, timedelta
+from heapq import merge
+from itertools import islice
+from operator import attrgetter
+from urllib.parse import urlencode
+from .models import ArchivedEvent, Event, RecurrenceRule
+from . import replicas, warmup
+from .profiling import tag
+from .recurrence import MAX_WINDOW_DAYS, expand_window, iter_occurrences
+from .sharding import SHARD_MOVE_GRACE_SECONDS, UserMoveInProgress, check_placement
+from .snapshot import SNAPSHOT_FIELDS, SnapshotRenderer, encode_window
+from .timezones import MAX_UTC_OFFSET, local_date, set_user_time_zone, user_time_zone, widen
+from .serializers import (
+    BatchItemSerializer, BatchSerializer, EventSerializer, EventBulkDeleteSerializer, SeriesTruncateSerializer,
+    UserTimeZoneSerializer
+)
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.models import User
 from .serializers import UserSerializer
 from rest_framework.views import APIView
+from django.http import Http404
+from django.urls import reverse
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+
+def include_archived(request):
+    """Archived events are only read when the client asks with ?include_archived=1."""
+    return request.query_params.get('include_archived') in ('1', 'true')
+
+
+def parse_fields(value):
+    """Parse a comma-separated sparse fieldset; None means all fields."""
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = sorted(set(fields) - set(EventSerializer.Meta.fields))
+    if unknown:
+        raise ValidationError({"fields": f"Unknown fields: {unknown}. Must be among {EventSerializer.Meta.fields}."})
+    return fields
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -21,121 +58,217 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class EventListCreateView(generics.ListCreateAPIView):
+class ReplicaReadMixin:
+    """Serve GET requests from read replicas unless the user wrote recently."""
+
+    def get(self, request, *args, **kwargs):
+        with replicas.replica_reads(request.user.pk):
+            return super().get(request, *args, **kwargs)
+
+
+class ShardMoveInProgress(APIException):
+    """The user's data is moving to another shard; answered with 503 and Retry-After."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Your calendar is being moved; try again shortly.'
+    default_code = 'shard_move_in_progress'
+    wait = SHARD_MOVE_GRACE_SECONDS  # Sent as Retry-After
+
+
+class PlacementCheckMixin:
+    """Check the user's shard placement before writes, bypassing the placement cache."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            try:
+                check_placement(request.user)
+            except UserMoveInProgress:
+                raise ShardMoveInProgress()
+
+
+class EventListCreateView(PlacementCheckMixin, ReplicaReadMixin, generics.ListCreateAPIView):
     """
     API view to list and create events for authenticated users.
 
     Supports filtering by date range and expands recurring events for calendar view.
+    A window can also be fetched whole as a binary columnar snapshot (see
+    `events.snapshot`).
     """
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, SnapshotRenderer]
 
-    def get_queryset(self):
+    # Model fields the window expansion reads, whatever the requested fieldset
+    EXPANSION_FIELDS = ('start_time', 'end_time', 'is_recurring', 'time_zone', 'recurrence_rule')
+
+    def get_requested_fields(self):
         """
-        Filter events by user and optional date range.
+        Parse the optional sparse fieldset, e.g. `?fields=id,title,start_time,end_time`.
+        """
+        return parse_fields(self.request.query_params.get('fields'))
 
-        Expands recurring events into instances within the date range.
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def restrict_queryset(self, queryset, fields, expanding):
         """
-        user = self.request.user
-        queryset = Event.objects.filter(user=user).order_by('start_time')
+        Push the requested fieldset down to the query.
+
+        Only the selected columns are loaded, and the recurrence rule is joined in
+        the same query whenever it is serialized or needed for expansion.
+        """
+        if fields is None or expanding or 'recurrence_rule' in fields:
+            queryset = queryset.select_related('recurrence_rule')
+        if fields is not None:
+            columns = {name for name in fields if name != 'id'}
+            if expanding:
+                columns.update(self.EXPANSION_FIELDS)
+            queryset = queryset.only(*columns)
+        return queryset
+
+    def get_window(self):
+        """
+        Get the date range from the query params, or (None, None) if there is none.
 
-        # Get date range from query params
+        Windows longer than MAX_WINDOW_DAYS are rejected with a 400.
+        """
         start_date = self.request.query_params.get('start_date')
         end_date = self.request.query_params.get('end_date')
-
-        if start_date and end_date:
-            try:
+        try:
+            if start_date and end_date:
                 start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
                 end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            except ValueError:
-                return queryset  # Invalid date format, return unfiltered
-
-            # Initialize list for expanded events
-            expanded_events = []
-            for event in queryset:
-                if event.is_recurring and event.recurrence_rule:
-                    instances = self.expand_recurring_event(event, start_date, end_date)
-                    expanded_events.extend(instances)
-                elif event.start_time.date() >= start_date and event.start_time.date() <= end_date:
-                    expanded_events.append(event)
-            
-            # Sort and filter expanded events
-            expanded_events.sort(key=lambda x: x.start_time)
-            return expanded_events
-        return queryset
+            else:
+                return None, None
+        except ValueError:
+            return None, None  # Invalid date format, return unfiltered
+        if (end_date - start_date).days >= MAX_WINDOW_DAYS:
+            raise ValidationError({'end_date': f'Windows are limited to {MAX_WINDOW_DAYS} days.'})
+        return start_date, end_date
+
+    def list(self, request, *args, **kwargs):
+        """Serve windows precomputed by `events.warmup` from the cache when possible."""
+        if request.accepted_renderer.format == SnapshotRenderer.format:
+            return self.snapshot(request)
+        start_date, end_date = self.get_window()
+        if start_date and not request.query_params.get('fields') and not include_archived(request):
+            data = warmup.cached_window(request.user.pk, start_date, end_date)
+            if data is not None:
+                return self.get_paginated_response(self.paginate_queryset(data))
+        return super().list(request, *args, **kwargs)
+
+    def snapshot(self, request):
+        """The whole window as a snapshot, encoded straight from the events (not paginated)."""
+        start_date, end_date = self.get_window()
+        if start_date is None:
+            return Response(
+                {'error': 'Snapshots need start_date and end_date (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        querysets = [Event.objects.for_user(request.user)]
+        if include_archived(request):
+            querysets.append(ArchivedEvent.objects.for_user(request.user))
+        events = []
+        for queryset in querysets:
+            events.extend(
+                queryset.in_window(start_date, end_date).select_related('recurrence_rule').only(*SNAPSHOT_FIELDS)
+            )
+        data = encode_window(events, start_date, end_date)
+        tag(request, window_days=(end_date - start_date).days + 1, snapshot_bytes=len(data))
+        return Response(data)
 
-    def expand_recurring_event(self, event, start_date, end_date):
+    def get_queryset(self):
         """
-        Expand a recurring event into instances within the date range.
+        Filter events by user and optional date range.
+
+        Expands recurring events into instances within the date range. Archived
+        events are merged in only when `include_archived` is requested.
         """
-        rule = event.recurrence_rule
-        frequency_map = {
-            'DAILY': rrule.DAILY,
-            'WEEKLY': rrule.WEEKLY,
-            'MONTHLY': rrule.MONTHLY,
-            'YEARLY': rrule.YEARLY
-        }
-        weekday_map = {
-            'MON': rrule.MO,
-            'TUE': rrule.TU,
-            'WED': rrule.WE,
-            'THU': rrule.TH,
-            'FRI': rrule.FR,
-            'SAT': rrule.SA,
-            'SUN': rrule.SU
-        }
+        user = self.request.user
+        fields = self.get_requested_fields()
+        start_date, end_date = self.get_window()
+        expanding = start_date is not None
+
+        events = Event.objects.for_user(user)
+        archived = ArchivedEvent.objects.for_user(user)
+        if expanding:
+            # Only rows that can occur in the window are loaded, like batch and snapshot windows
+            events, archived = events.in_window(start_date, end_date), archived.in_window(start_date, end_date)
+
+        queryset = self.restrict_queryset(events.order_by('start_time'), fields, expanding)
+        if include_archived(self.request):
+            archived = self.restrict_queryset(archived.order_by('start_time'), fields, expanding)
+            queryset = list(merge(queryset, archived, key=attrgetter('start_time')))
+
+        if expanding:
+            expanded_events = expand_window(queryset, start_date, end_date)
+            tag(
+                self.request,
+                window_days=(end_date - start_date).days + 1,
+                expanded_series=sum(1 for event in queryset if event.is_recurring and event.recurrence_rule),
+                expanded_events=len(expanded_events)
+            )
+            return expanded_events
+        return queryset
 
-        # Base rrule parameters
-        rrule_kwargs = {
-            'freq': frequency_map[rule.frequency],
-            'dtstart': event.start_time,
-            'interval': rule.interval,
-            'until': rule.end_date if rule.end_date else end_date
-        }
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+        warmup.events_changed(self.request.user.pk)
 
-        # Handle WEEKLY weekdays
-        if rule.frequency == 'WEEKLY' and rule.weekdays:
-            rrule_kwargs['byweekday'] = [weekday_map[day] for day in rule.weekdays]
 
-        # Handle MONTHLY relative-date patterns
-        if rule.frequency == 'MONTHLY' and rule.weekday and rule.ordinal:
-            rrule_kwargs['byweekday'] = weekday_map[rule.weekday]
-            rrule_kwargs['bysetpos'] = rule.ordinal
 
-        # Generate recurrence instances
+class UpcomingEventsView(APIView):
+    """
+    API view returning the next N occurrences for the authenticated user.
+
+    Single events come from an indexed cursor over `start_time`; every active
+    recurring series contributes a lazy occurrence iterator. The streams are
+    heap-merged and consumption stops after `limit` results, so the cost depends
+    on `limit` and the number of active series, not on any date window.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 5
+    max_limit = 100
+
+    def get(self, request):
         try:
-            rr = rrule.rrule(**rrule_kwargs)
-            duration = event.end_time - event.start_time
-            instances = []
-
-            for dt in rr:
-                if dt.date() < start_date or dt.date() > end_date:
-                    continue
-                # Create a new Event instance (not saved to DB)
-                instance = Event(
-                    user=event.user,
-                    title=event.title,
-                    description=event.description,
-                    location=event.location,
-                    start_time=dt,
-                    end_time=dt + duration,
-                    is_recurring=False,  # Instances are not recurring
-                    created_at=event.created_at,
-                    updated_at=event.updated_at
-                )
-                instances.append(instance)
-            return instances
+            limit = int(request.query_params.get('limit', self.default_limit))
         except ValueError:
-            return []  # Invalid rrule, skip event
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limit <= self.max_limit:
+            return Response(
+                {'error': f'limit must be between 1 and {self.max_limit}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        after = timezone.now()
+        if request.query_params.get('after'):
+            try:
+                after = parse_datetime(request.query_params['after'])
+            except ValueError:
+                after = None  # Well-formed but not a valid date, e.g. February 30th
+            if after is None:
+                return Response({'error': 'after must be an ISO 8601 datetime'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(after):
+                after = timezone.make_aware(after)
+
+        events = Event.objects.for_user(request.user)
+        singles = events.filter(recurrence_rule__isnull=True, start_time__gte=after).order_by('start_time')[:limit]
+        series = events.filter(recurrence_rule__isnull=False).filter(
+            Q(recurrence_rule__end_date__isnull=True) | Q(recurrence_rule__end_date__gte=widen(after, -MAX_UTC_OFFSET).date())
+        ).select_related('recurrence_rule')
 
+        streams = [iter(singles)] + [iter_occurrences(event, after) for event in series]
+        upcoming = list(islice(merge(*streams, key=attrgetter('start_time')), limit))
+        tag(request, limit=limit, expanded_series=len(streams) - 1)
+        return Response(EventSerializer(upcoming, many=True).data)
 
 
-class EventRetrieveUpdateView(generics.RetrieveUpdateAPIView):
+class EventRetrieveUpdateView(PlacementCheckMixin, ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     """
     API view to retrieve and update events for authenticated users.
     
@@ -148,11 +281,24 @@ class EventRetrieveUpdateView(generics.RetrieveUpdateAPIView):
     
     def get_queryset(self):
         """Restrict queryset to only events belonging to the requesting user."""
-        return Event.objects.filter(user=self.request.user)
+        return Event.objects.for_user(self.request.user).select_related('recurrence_rule')
     
+    def retrieve(self, request, *args, **kwargs):
+        """Fall back to the archive table when `include_archived` is requested."""
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if not include_archived(request):
+                raise
+            archived = ArchivedEvent.objects.for_user(request.user).filter(pk=kwargs['pk']).first()
+            if archived is None:
+                raise
+            return Response(self.get_serializer(archived).data)
+
     def perform_update(self, serializer):
         """Ensure the user field remains unchanged when updating."""
         serializer.save(user=self.request.user)
+        warmup.events_changed(self.request.user.pk)
         
     def update(self, request, *args, **kwargs):
         """Handle update with the same validations as creation."""
@@ -192,7 +338,7 @@ class EventRetrieveUpdateView(generics.RetrieveUpdateAPIView):
 
 
 
-class EventDeleteView(generics.DestroyAPIView):
+class EventDeleteView(PlacementCheckMixin, generics.DestroyAPIView):
     """
     API view to handle event deletion
     """
@@ -201,24 +347,110 @@ class EventDeleteView(generics.DestroyAPIView):
     serializer_class = EventSerializer  # Add this line
     
     def get_queryset(self):
-        return Event.objects.filter(user=self.request.user)
+        return Event.objects.for_user(self.request.user)
     
     def delete(self, request, *args, **kwargs):
-        event = self.get_object()
-        
-        # Delete related recurrence rule first if it exists
-        if event.recurrence_rule:
-            event.recurrence_rule.delete()
-        
-        # Then delete the event
-        event.delete()
-        
+        # Event and recurrence rule are removed with set-based deletes
+        deleted = self.get_queryset().filter(pk=kwargs['pk']).delete_with_rules()
+        if not deleted:
+            return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+        warmup.events_changed(request.user.pk)
+
         return Response(
             {'message': 'Event deleted successfully'},
             status=status.HTTP_200_OK
         )
 
 
+class EventBulkDeleteView(PlacementCheckMixin, APIView):
+    """
+    API view to delete many events in one request.
+
+    Accepts an id list and/or date filters and deletes the matching events and
+    their recurrence rules with a constant number of queries.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = EventBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        criteria = serializer.validated_data
+
+        queryset = Event.objects.for_user(request.user)
+        if 'ids' in criteria:
+            queryset = queryset.filter(pk__in=criteria['ids'])
+        if 'start_date' in criteria:
+            # Half-open range on start_time so the (user, start_time) index is usable
+            queryset = queryset.filter(
+                start_time__gte=timezone.make_aware(datetime.combine(criteria['start_date'], time.min)),
+                start_time__lt=timezone.make_aware(datetime.combine(criteria['end_date'] + timedelta(days=1), time.min))
+            )
+        if 'created_after' in criteria:
+            queryset = queryset.filter(created_at__gte=criteria['created_after'])
+        if 'created_before' in criteria:
+            queryset = queryset.filter(created_at__lt=criteria['created_before'])
+
+        deleted = queryset.delete_with_rules()
+        if deleted:
+            warmup.events_changed(request.user.pk)
+        return Response(
+            {'message': f'{deleted} event(s) deleted successfully', 'deleted': deleted},
+            status=status.HTTP_200_OK
+        )
+
+
+class EventSeriesTruncateView(PlacementCheckMixin, APIView):
+    """
+    API view to end a recurring series before a given date.
+
+    Only the series' rule end date changes; no occurrences are materialized.
+    Because rules are shared, the event is re-pointed at the interned rule with
+    the new end date instead of editing the rule in place.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        serializer = SeriesTruncateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        from_date = serializer.validated_data['from_date']
+        new_end_date = from_date - timedelta(days=1)
+
+        event = Event.objects.for_user(request.user).filter(pk=pk).select_related('recurrence_rule').first()
+        if event is None:
+            return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+        rule = event.recurrence_rule
+        if not event.is_recurring or not rule:
+            return Response({'error': 'Event is not a recurring series'}, status=status.HTTP_400_BAD_REQUEST)
+        if local_date(event) >= from_date:
+            return Response(
+                {'error': 'from_date must be after the series start; delete the event instead'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if rule.end_date and rule.end_date <= new_end_date:
+            return Response(
+                {'message': 'Series already ends before from_date', 'end_date': rule.end_date},
+                status=status.HTTP_200_OK
+            )
+
+        db = event._state.db
+        with transaction.atomic(using=db):
+            truncated = RecurrenceRule.objects.using(db).intern(
+                frequency=rule.frequency,
+                interval=rule.interval,
+                end_date=new_end_date,
+                weekdays=rule.weekdays,
+                weekday=rule.weekday,
+                ordinal=rule.ordinal
+            )
+            Event.objects.using(db).filter(pk=event.pk).update(recurrence_rule=truncated)
+        RecurrenceRule.objects.using(db).filter(pk=rule.pk).delete_orphaned()
+        warmup.events_changed(request.user.pk)
+
+        return Response(
+            {'message': 'Series truncated successfully', 'end_date': new_end_date},
+            status=status.HTTP_200_OK
+        )
+
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -240,13 +472,151 @@ class RegisterView(generics.CreateAPIView):
 
 
 
+class WarmingTokenObtainPairView(TokenObtainPairView):
+    """
+    Obtain a JWT pair and start warming the user's calendar windows.
+
+    By the time the client has stored the token and asks for the month view,
+    the expansion has usually run in the background already.
+    """
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            warmup.schedule(AccessToken(response.data['access'])[jwt_settings.USER_ID_CLAIM])
+        return response
+
+
+def current_user_data(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'time_zone': user_time_zone(user)
+    }
+
+
 class CurrentUserView(APIView):
+    """
+    The authenticated user; PATCH sets their default time zone for new events.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        return Response({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email
-        })
\ No newline at end of file
+        return Response(current_user_data(request.user))
+
+    def patch(self, request):
+        serializer = UserTimeZoneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        set_user_time_zone(request.user, serializer.validated_data['time_zone'])
+        return Response(current_user_data(request.user))
+
+
+class BatchView(APIView):
+    """
+    API view answering several read sub-requests in one round trip.
+
+    Accepts `{"requests": [...]}` with calendar windows (`events`), single events
+    (`event`) and the current user (`current_user`). Authentication runs once,
+    and the rows are shared: all windows are served from one query over their
+    union, so each series is loaded once and expanded per window, and all
+    detail ids are fetched together. Each sub-request gets its own status, so
+    an invalid one does not fail the others.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        items = []
+        for index, data in enumerate(serializer.validated_data['requests']):
+            item = BatchItemSerializer(data=data)
+            if not item.is_valid():
+                items.append((str(data.get('id', index)), None, item.errors))
+                continue
+            try:
+                fields = parse_fields(item.validated_data.get('fields'))
+            except ValidationError as exc:
+                items.append((str(data.get('id', index)), None, exc.detail))
+                continue
+            items.append((item.validated_data.get('id', str(index)), {**item.validated_data, 'fields': fields}, None))
+
+        valid = [data for _, data, _ in items if data is not None]
+        windows = [data for data in valid if data['type'] == 'events']
+        events = self.load_window_events(Event.objects.for_user(request.user), windows)
+        archived = self.load_window_events(
+            ArchivedEvent.objects.for_user(request.user),
+            [data for data in windows if data['include_archived']]
+        )
+        details = self.load_details(request.user, [data for data in valid if data['type'] == 'event'])
+
+        responses = []
+        for item_id, data, errors in items:
+            if data is None:
+                result = (status.HTTP_400_BAD_REQUEST, errors)
+            elif data['type'] == 'events':
+                rows = list(merge(events, archived, key=attrgetter('start_time'))) if data['include_archived'] else events
+                result = self.window(request, rows, data)
+            elif data['type'] == 'event':
+                event = details.get(data['pk'])
+                if event is None or (isinstance(event, ArchivedEvent) and not data['include_archived']):
+                    result = (status.HTTP_404_NOT_FOUND, {'error': 'Event not found'})
+                else:
+                    result = (status.HTTP_200_OK, EventSerializer(event, fields=data['fields']).data)
+            else:
+                result = (status.HTTP_200_OK, current_user_data(request.user))
+            responses.append({'id': item_id, 'status': result[0], 'body': result[1]})
+        return Response({'responses': responses})
+
+    def load_window_events(self, queryset, windows):
+        """
+        Rows needed by all `windows`: single events starting within their union,
+        and every series that has not ended before it.
+        """
+        if not windows:
+            return []
+        return list(
+            queryset.in_window(min(data['start_date'] for data in windows), max(data['end_date'] for data in windows))
+            .select_related('recurrence_rule')
+            .order_by('start_time')
+        )
+
+    def load_details(self, user, requests):
+        """Events requested by id, falling back to the archive, keyed by pk."""
+        pks = {data['pk'] for data in requests}
+        if not pks:
+            return {}
+        found = {event.pk: event for event in Event.objects.for_user(user).filter(pk__in=pks).select_related('recurrence_rule')}
+        missing = {data['pk'] for data in requests if data['include_archived']} - set(found)
+        if missing:
+            found.update(
+                (event.pk, event)
+                for event in ArchivedEvent.objects.for_user(user).filter(pk__in=missing).select_related('recurrence_rule')
+            )
+        return found
+
+    def window(self, request, rows, data):
+        """One page of a calendar window, shaped like the paginated listing."""
+        expanded = expand_window(rows, data['start_date'], data['end_date'])
+        offset = (data['page'] - 1) * data['page_size']
+        if offset and offset >= len(expanded):
+            return status.HTTP_404_NOT_FOUND, {'error': 'Invalid page'}
+        page = expanded[offset:offset + data['page_size']]
+        return status.HTTP_200_OK, {
+            'count': len(expanded),
+            'next': self.page_link(request, data, data['page'] + 1) if offset + len(page) < len(expanded) else None,
+            'previous': self.page_link(request, data, data['page'] - 1) if data['page'] > 1 else None,
+            'results': EventSerializer(page, many=True, fields=data['fields']).data
+        }
+
+    def page_link(self, request, data, page):
+        """URL of another page of the window on the listing endpoint."""
+        params = {'start_date': data['start_date'], 'end_date': data['end_date'], 'page_size': data['page_size']}
+        if page > 1:
+            params['page'] = page
+        if data['fields'] is not None:
+            params['fields'] = ','.join(data['fields'])
+        if data['include_archived']:
+            params['include_archived'] = 1
+        return request.build_absolute_uri(f"{reverse('event-list-create')}?{urlencode(params)}")
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Background warm-up of calendar windows.
+
+The first calendar load after login has to expand every series cold. To hide
+that, logging in and every write schedule a job that precomputes the serialized
+listing of the current and next month for the user and stores it in the Django
+cache, where `EventListCreateView` picks it up.
+
+Jobs run on a small bounded thread pool. At most one job per user is in flight;
+a request arriving meanwhile only marks the job to run once more, so bursts of
+writes never queue duplicate work. Cached windows are keyed by a per-user
+version that every write bumps, so stale payloads are never served.
+
+Warming is off by default (`EVENT_WARMUP_WORKERS = 0`). Only enable it with a
+cache shared by every worker process (e.g. Redis): with Django's default
+per-process cache, a write bumps the version in one process only, and the
+others would keep serving their stale windows.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+# user id -> whether the in-flight job has to run again
+_in_flight = {}
+
+
+def get_workers():
+    return getattr(settings, 'EVENT_WARMUP_WORKERS', 0)
+
+
+def _version_key(user_id):
+    return f'event-window-version:{user_id}'
+
+
+def _window_key(user_id, version, start_date, end_date):
+    return f'event-window:{user_id}:{version}:{start_date}:{end_date}'
+
+
+def month_windows(today):
+    """The (start_date, end_date) of the current and the next calendar month."""
+    windows = []
+    first = today.replace(day=1)
+    for _ in range(2):
+        following = (first + timedelta(days=32)).replace(day=1)
+        windows.append((first, following - timedelta(days=1)))
+        first = following
+    return windows
+
+
+def cached_window(user_id, start_date, end_date):
+    """Serialized listing of a warm window, or None if it is not cached or warming is off."""
+    if not get_workers():
+        return None
+    version = cache.get(_version_key(user_id), 0)
+    return cache.get(_window_key(user_id, version, start_date, end_date))
+
+
+def warm_user(user_id):
+    """Compute and cache the month windows of a user (synchronously)."""
+    from .models import Event
+    from .recurrence import expand_window
+    from .serializers import EventSerializer
+
+    version = cache.get(_version_key(user_id), 0)
+    windows = month_windows(timezone.now().date())
+    events = list(
+        Event.objects.for_user(user_id).in_window(windows[0][0], windows[-1][1])
+        .select_related('recurrence_rule').order_by('start_time')
+    )
+    timeout = getattr(settings, 'EVENT_WARMUP_TIMEOUT', 600)
+    for start_date, end_date in windows:
+        data = EventSerializer(expand_window(events, start_date, end_date), many=True).data
+        cache.set(_window_key(user_id, version, start_date, end_date), [dict(item) for item in data], timeout)
+
+
+def invalidate(user_id):
+    """Stop serving the warm windows of a user."""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), 1, None)
+
+
+def events_changed(user_id):
+    """Invalidate the warm windows of a user after a write and schedule a rebuild."""
+    invalidate(user_id)
+    schedule(user_id)
+
+
+def schedule(user_id):
+    """
+    Warm a user's windows in the background.
+
+    Deduplicated per user and dropped when `EVENT_WARMUP_MAX_PENDING` users are
+    already waiting. Does nothing when `EVENT_WARMUP_WORKERS` is 0.
+    """
+    global _executor
+
+    workers = get_workers()
+    if not workers:
+        return
+    with _lock:
+        if user_id in _in_flight:
+            _in_flight[user_id] = True
+            return
+        if len(_in_flight) >= getattr(settings, 'EVENT_WARMUP_MAX_PENDING', 100):
+            return
+        _in_flight[user_id] = False
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='event-warmup')
+    _executor.submit(_run, user_id)
+
+
+def _run(user_id):
+    try:
+        while True:
+            try:
+                warm_user(user_id)
+            except Exception:
+                logger.exception("Warming calendar windows of user %s failed", user_id)
+            with _lock:
+                if not _in_flight[user_id]:
+                    del _in_flight[user_id]
+                    return
+                _in_flight[user_id] = False
+    finally:
+        # Worker threads keep their own connections; don't leave them open
+        connections.close_all()